@@ -7,10 +7,14 @@ Based on ALL Agent.ipynb - Standalone service for frontend integration
 import os
 import sys
 import json
-import time
 import uuid
+import io
+import random
+import zipfile
 import re
 import ast
+import hashlib
+import functools
 import subprocess
 import logging
 import shutil
@@ -19,25 +23,46 @@ import asyncio
 import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Union, Callable, Tuple
-from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Union, Callable, Tuple, Set
+from dataclasses import dataclass, field, asdict, is_dataclass
+from collections import defaultdict, OrderedDict
 from abc import ABC, abstractmethod
-import websockets
+import importlib.util
 import signal
-from concurrent.futures import ThreadPoolExecutor
 
-# Install required dependencies
-packages_to_install = [
-    'langchain', 'langchain-groq', 'langgraph', 'pydantic', 
-    'matplotlib', 'seaborn', 'requests', 'pillow', 'websockets', 'fastapi', 'uvicorn'
-]
+# Required dependencies (pip name -> import name)
+packages_to_install = {
+    'langchain': 'langchain',
+    'langchain-groq': 'langchain_groq',
+    'langgraph': 'langgraph',
+    'pydantic': 'pydantic',
+    'matplotlib': 'matplotlib',
+    'seaborn': 'seaborn',
+    'requests': 'requests',
+    'pillow': 'PIL',
+    'websockets': 'websockets',
+    'fastapi': 'fastapi',
+    'uvicorn': 'uvicorn',
+    'pyahocorasick': 'ahocorasick',
+    'orjson': 'orjson',
+    'uvloop': 'uvloop',
+    'httptools': 'httptools',
+}
+
+# Install missing dependencies only when explicitly enabled (AGENT_AUTOINSTALL=1)
+if os.getenv("AGENT_AUTOINSTALL") == "1":
+    missing_packages = [
+        pip_name for pip_name, import_name in packages_to_install.items()
+        if importlib.util.find_spec(import_name) is None
+    ]
+    if missing_packages:
+        try:
+            subprocess.run([sys.executable, '-m', 'pip', 'install', *missing_packages, '--quiet'],
+                          check=True, capture_output=True)
+        except subprocess.CalledProcessError as e:
+            print(f"Warning: Failed to install {', '.join(missing_packages)}: {e}")
 
-for package in packages_to_install:
-    try:
-        subprocess.run([sys.executable, '-m', 'pip', 'install', package, '--quiet'], 
-                      check=True, capture_output=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Warning: Failed to install {package}: {e}")
+import websockets
 
 # Import dependencies
 try:
@@ -51,14 +76,63 @@ try:
     import seaborn as sns
     import requests
     from PIL import Image, ImageDraw, ImageFont
-    from fastapi import FastAPI, WebSocket, WebSocketDisconnect, File, UploadFile, Form
+    from fastapi import FastAPI, WebSocket, WebSocketDisconnect, File, UploadFile, Form, Response
     from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import FileResponse, StreamingResponse
     import uvicorn
     PACKAGES_AVAILABLE = True
 except ImportError as e:
     print(f"Some packages not available: {e}")
     PACKAGES_AVAILABLE = False
 
+# Optional Aho-Corasick automaton for framework keyword detection
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Optional fast JSON encoder for websocket broadcasts
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Optional libuv-based event loop and C HTTP parser for the server
+UVLOOP_AVAILABLE = importlib.util.find_spec("uvloop") is not None
+HTTPTOOLS_AVAILABLE = importlib.util.find_spec("httptools") is not None
+
+def _json_default(obj: Any) -> Any:
+    """Let the stdlib json encoder handle ParsedStep and other dataclasses"""
+    if is_dataclass(obj):
+        return asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _encode_artifact(content: Any) -> bytes:
+    """Artifact bytes on disk: str content as UTF-8 text, anything else as indented JSON"""
+    if isinstance(content, str):
+        return content.encode('utf-8')
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, option=orjson.OPT_INDENT_2)
+    return json.dumps(content, indent=2, default=_json_default).encode('utf-8')
+
+def _atomic_write(path: str, content: Any):
+    """Write an artifact through a temp file so readers never see a partial file"""
+    _ensure(os.path.dirname(path))
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_encode_artifact(content))
+    os.replace(tmp_path, path)
+
+# Websocket message encoder, picked once at import; the frontend expects text frames
+if ORJSON_AVAILABLE:
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+else:
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, separators=(',', ':'), default=_json_default)
+
 # Configuration
 @dataclass
 class TestAutomationConfig:
@@ -67,6 +141,8 @@ class TestAutomationConfig:
     temperature: float = 0.2
     max_tokens: int = 4096
     output_dir: str = "agent_output"
+    max_active_runs: int = int(os.getenv("AGENT_MAX_RUNS", "256"))
+    persist_artifacts: bool = os.getenv("AGENT_PERSIST_ARTIFACTS", "1") == "1"
     node_executable: str = "node"
     npm_executable: str = "npm"
     npx_executable: str = "npx"
@@ -81,24 +157,78 @@ class TestAutomationConfig:
 
 config = TestAutomationConfig()
 
-# Create output directories
-directories = [
-    config.output_dir,
-    f"{config.output_dir}/features",
-    f"{config.output_dir}/tests", 
-    f"{config.output_dir}/coverage",
-    f"{config.output_dir}/reports",
-    f"{config.output_dir}/images",
-    f"{config.output_dir}/input_files",
-    f"{config.output_dir}/execution_logs",
-    f"{config.output_dir}/config"
-]
-
-for directory in directories:
-    os.makedirs(directory, exist_ok=True)
+# Output directories are created at startup (or on first write) rather than at import
+_ensured_dirs: Set[str] = set()
+
+def _ensure(directory: str) -> str:
+    """Create an output directory once per process and return it"""
+    if directory not in _ensured_dirs:
+        os.makedirs(directory, exist_ok=True)
+        _ensured_dirs.add(directory)
+    return directory
+
+@dataclass(slots=True)
+class ParsedStep:
+    """A single test step recognised by EnhancedCodeAnalyzer.parse_test_steps"""
+    type: str
+    action: str = ''
+    selector: str = ''
+    value: str = ''
+    url: str = ''
+    assertion_type: str = ''
+    expected_value: str = ''
+    css_property: str = ''
+    line_number: int = 0
+    original_code: str = ''
+
+# Complexity weight per step type; unknown types score nothing
+_STEP_SCORES = {
+    'navigation': 1,
+    'click': 2,
+    'input': 3,
+    'assert_url': 2,
+    'assert_value': 2,
+    'assert_css': 2,
+}
 
 # Enhanced Code Analyzer
 class EnhancedCodeAnalyzer:
+    url_extraction_patterns = [
+        r'cy\.visit\s*\(\s*["\']([^"\']+)["\']',
+        r'cy\.url\(\)\s*\.should\s*\(\s*["\']eq["\'],\s*["\']([^"\']+)["\']',
+        r'page\.goto\s*\(\s*["\']([^"\']+)["\']',
+        r'await\s+page\.goto\s*\(\s*["\']([^"\']+)["\']',
+        r'driver\.get\s*\(\s*["\']([^"\']+)["\']',
+        r'get\s*\(\s*["\']([^"\']+)["\']',
+        r'["\']https?://[^"\']+["\']'
+    ]
+
+    # Patterns are compiled once when the class is created
+    _url_res = [re.compile(pattern) for pattern in url_extraction_patterns]
+    # Step patterns in priority order; only the first one matching a line is used.
+    # Whitespace and quoted values exclude '\n' so a match never spans lines.
+    _step_patterns = {
+        'chain': r'cy\.get[^\S\n]*\([^\S\n]*["\']([^"\'\n]+)["\'][^\S\n]*\)[^\S\n]*\.type[^\S\n]*\([^\S\n]*["\']([^"\'\n]*)["\'].*\.should[^\S\n]*\([^\S\n]*["\']have\.value["\'][^\S\n]*,[^\S\n]*["\']([^"\'\n]*)["\']',
+        'url_assert': r'cy\.url\(\)[^\S\n]*\.should[^\S\n]*\([^\S\n]*["\']eq["\'][^\S\n]*,[^\S\n]*["\']([^"\'\n]+)["\']',
+        'nav': r'(cy\.visit|page\.goto|driver\.get)[^\S\n]*\([^\S\n]*["\']([^"\'\n]+)["\']',
+        'click': r'cy\.get[^\S\n]*\([^\S\n]*["\']([^"\'\n]+)["\'].*\.click[^\S\n]*\(',
+        'type': r'cy\.get[^\S\n]*\([^\S\n]*["\']([^"\'\n]+)["\'].*\.type[^\S\n]*\([^\S\n]*["\']([^"\'\n]*)["\']',
+    }
+    # Single line-anchored scan over the whole source: skips blank and comment
+    # lines, then tries each step pattern as a lookahead in priority order
+    _step_re = re.compile(
+        r'^[^\S\n]*(?![^\S\n]|//|\*)(?:'
+        + '|'.join(
+            f'(?=(?!.*\\.should\\().*?(?P<{name}>{pattern}))' if name == 'type'
+            else f'(?=.*?(?P<{name}>{pattern}))'
+            for name, pattern in _step_patterns.items()
+        )
+        + ')',
+        re.MULTILINE
+    )
+    _filename_sanitize_re = re.compile(r'[^\w\-_]')
+    analysis_cache_size = 512
+
     def __init__(self):
         self.framework_patterns = {
             'cypress': {
@@ -122,21 +252,38 @@ class EnhancedCodeAnalyzer:
                 'weight': 2
             }
         }
-        
-        self.url_extraction_patterns = [
-            r'cy\.visit\s*\(\s*["\']([^"\']+)["\']',
-            r'cy\.url\(\)\s*\.should\s*\(\s*["\']eq["\'],\s*["\']([^"\']+)["\']',
-            r'page\.goto\s*\(\s*["\']([^"\']+)["\']',
-            r'await\s+page\.goto\s*\(\s*["\']([^"\']+)["\']',
-            r'driver\.get\s*\(\s*["\']([^"\']+)["\']',
-            r'get\s*\(\s*["\']([^"\']+)["\']',
-            r'["\']https?://[^"\']+["\']'
-        ]
+
+        # Map every keyword/import string to the (framework, score) pairs it adds
+        self._keyword_scores: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+        for framework, patterns in self.framework_patterns.items():
+            for keyword in patterns['keywords']:
+                self._keyword_scores[keyword].append((framework, patterns['weight']))
+            for import_pattern in patterns['imports']:
+                self._keyword_scores[import_pattern].append((framework, patterns['weight'] * 2))
+
+        # Single-pass multi-pattern matcher over all keywords
+        self._keyword_automaton = None
+        if AHOCORASICK_AVAILABLE:
+            self._keyword_automaton = ahocorasick.Automaton()
+            for keyword in self._keyword_scores:
+                self._keyword_automaton.add_word(keyword, keyword)
+            self._keyword_automaton.make_automaton()
+
+        # LRU of analyses keyed by (content digest, filename)
+        self._analysis_cache: "OrderedDict[Tuple[bytes, str], Dict[str, Any]]" = OrderedDict()
+
+    def _find_keywords(self, code: str) -> Set[str]:
+        if self._keyword_automaton is not None:
+            return {keyword for _, keyword in self._keyword_automaton.iter(code)}
+        return {keyword for keyword in self._keyword_scores if keyword in code}
 
     def extract_real_urls(self, code: str) -> List[str]:
+        # Only http(s) URLs are kept, so skip every scan when none can match
+        if 'http' not in code:
+            return []
         urls = []
-        for pattern in self.url_extraction_patterns:
-            matches = re.findall(pattern, code, re.MULTILINE)
+        for url_re in self._url_res:
+            matches = url_re.findall(code)
             for match in matches:
                 if isinstance(match, tuple):
                     for url in match:
@@ -146,105 +293,93 @@ class EnhancedCodeAnalyzer:
                     if match and match.startswith(('http://', 'https://')):
                         urls.append(match.strip('\'"'))
         
-        # Remove duplicates
-        unique_urls = []
-        for url in urls:
-            if url not in unique_urls:
-                unique_urls.append(url)
-        return unique_urls
-
-    def parse_test_steps(self, code: str) -> List[Dict[str, Any]]:
+        # Remove duplicates, keeping first-seen order
+        return list(dict.fromkeys(urls))
+
+    def parse_test_steps(self, code: str) -> List[ParsedStep]:
         parsed_steps = []
-        lines = code.split('\n')
-        
-        for line_num, line in enumerate(lines, 1):
-            line = line.strip()
-            if not line or line.startswith('//') or line.startswith('*'):
-                continue
-                
+        # Matches arrive in source order, so line numbers advance by counting
+        # the newlines skipped since the previous match
+        line_num = 1
+        last_start = 0
+
+        for match in self._step_re.finditer(code):
+            kind = match.lastgroup
+            base = self._step_re.groupindex[kind]
+            line_start = match.start()
+            line_end = code.find('\n', line_start)
+            line = code[line_start:line_end if line_end != -1 else len(code)].strip()
+            line_num += code.count('\n', last_start, line_start)
+            last_start = line_start
+
             # Chain pattern
-            chain_pattern = r'cy\.get\s*\(\s*["\']([^"\']+)["\']\s*\)\s*\.type\s*\(\s*["\']([^"\']*)["\'].*\.should\s*\(\s*["\']have\.value["\']\s*,\s*["\']([^"\']*)["\']'
-            chain_match = re.search(chain_pattern, line)
-            if chain_match:
-                selector, type_value, assert_value = chain_match.groups()
-                parsed_steps.append({
-                    'type': 'input',
-                    'action': 'type',
-                    'selector': selector,
-                    'value': type_value,
-                    'line_number': line_num,
-                    'original_code': line
-                })
-                parsed_steps.append({
-                    'type': 'assert_value',
-                    'action': 'should',
-                    'selector': selector,
-                    'assertion_type': 'have.value',
-                    'expected_value': assert_value,
-                    'line_number': line_num,
-                    'original_code': line
-                })
-                continue
-                
+            if kind == 'chain':
+                selector, type_value, assert_value = match.group(base + 1, base + 2, base + 3)
+                parsed_steps.append(ParsedStep(
+                    type='input',
+                    action='type',
+                    selector=selector,
+                    value=type_value,
+                    line_number=line_num,
+                    original_code=line
+                ))
+                parsed_steps.append(ParsedStep(
+                    type='assert_value',
+                    action='should',
+                    selector=selector,
+                    assertion_type='have.value',
+                    expected_value=assert_value,
+                    line_number=line_num,
+                    original_code=line
+                ))
+
             # URL assertion
-            url_assert_pattern = r'cy\.url\(\)\s*\.should\s*\(\s*["\']eq["\']\s*,\s*["\']([^"\']+)["\']'
-            url_match = re.search(url_assert_pattern, line)
-            if url_match:
-                expected_url = url_match.group(1)
-                parsed_steps.append({
-                    'type': 'assert_url',
-                    'action': 'should',
-                    'selector': 'url',
-                    'assertion_type': 'eq',
-                    'expected_value': expected_url,
-                    'line_number': line_num,
-                    'original_code': line
-                })
-                continue
-                
+            elif kind == 'url_assert':
+                expected_url = match.group(base + 1)
+                parsed_steps.append(ParsedStep(
+                    type='assert_url',
+                    action='should',
+                    selector='url',
+                    assertion_type='eq',
+                    expected_value=expected_url,
+                    line_number=line_num,
+                    original_code=line
+                ))
+
             # Navigation
-            nav_pattern = r'(cy\.visit|page\.goto|driver\.get)\s*\(\s*["\']([^"\']+)["\']'
-            nav_match = re.search(nav_pattern, line)
-            if nav_match:
-                action, url = nav_match.groups()
-                parsed_steps.append({
-                    'type': 'navigation',
-                    'action': action,
-                    'url': url,
-                    'line_number': line_num,
-                    'original_code': line
-                })
-                continue
-                
+            elif kind == 'nav':
+                action, url = match.group(base + 1, base + 2)
+                parsed_steps.append(ParsedStep(
+                    type='navigation',
+                    action=action,
+                    url=url,
+                    line_number=line_num,
+                    original_code=line
+                ))
+
             # Click
-            click_pattern = r'cy\.get\s*\(\s*["\']([^"\']+)["\'].*\.click\s*\('
-            click_match = re.search(click_pattern, line)
-            if click_match:
-                selector = click_match.group(1)
-                parsed_steps.append({
-                    'type': 'click',
-                    'action': 'click',
-                    'selector': selector,
-                    'line_number': line_num,
-                    'original_code': line
-                })
-                continue
-                
+            elif kind == 'click':
+                selector = match.group(base + 1)
+                parsed_steps.append(ParsedStep(
+                    type='click',
+                    action='click',
+                    selector=selector,
+                    line_number=line_num,
+                    original_code=line
+                ))
+
             # Type
-            type_pattern = r'cy\.get\s*\(\s*["\']([^"\']+)["\'].*\.type\s*\(\s*["\']([^"\']*)["\']'
-            type_match = re.search(type_pattern, line)
-            if type_match and '.should(' not in line:
-                selector, value = type_match.groups()
-                parsed_steps.append({
-                    'type': 'input',
-                    'action': 'type',
-                    'selector': selector,
-                    'value': value,
-                    'line_number': line_num,
-                    'original_code': line
-                })
-                continue
-                
+            elif kind == 'type':
+                selector, value = match.group(base + 1, base + 2)
+                parsed_steps.append(ParsedStep(
+                    type='input',
+                    action='type',
+                    selector=selector,
+                    value=value,
+                    line_number=line_num,
+                    original_code=line
+                ))
+
         return parsed_steps
 
     def detect_language_and_framework(self, filename: str, code: str) -> Tuple[str, List[str]]:
@@ -265,22 +400,43 @@ class EnhancedCodeAnalyzer:
         }
         language = language_map.get(ext, 'javascript')
         
-        frameworks = []
-        for framework, patterns in self.framework_patterns.items():
-            score = 0
-            for keyword in patterns['keywords']:
-                if keyword in code:
-                    score += patterns['weight']
-            for import_pattern in patterns['imports']:
-                if import_pattern in code:
-                    score += patterns['weight'] * 2
-            if score > 0:
-                frameworks.append((framework, score))
-                
+        keywords = self._find_keywords(code)
+        if not keywords:
+            return language, []
+
+        scores = defaultdict(int)
+        for keyword in keywords:
+            for framework, score in self._keyword_scores[keyword]:
+                scores[framework] += score
+
+        frameworks = [
+            (framework, scores[framework])
+            for framework in self.framework_patterns
+            if scores[framework] > 0
+        ]
+
         frameworks.sort(key=lambda x: x[1], reverse=True)
         return language, [f[0] for f in frameworks]
 
     def analyze_code(self, code: str, filename: str = "") -> Dict[str, Any]:
+        # Resubmitted files reuse the previous analysis. Agents add keys to the
+        # returned dict, so hand out a shallow copy with a fresh timestamp.
+        digest = hashlib.blake2b(code.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        key = (digest, filename)
+        cached = self._analysis_cache.get(key)
+        if cached is None:
+            cached = self._analyze_uncached(code, filename)
+            self._analysis_cache[key] = cached
+            if len(self._analysis_cache) > self.analysis_cache_size:
+                self._analysis_cache.popitem(last=False)
+        else:
+            self._analysis_cache.move_to_end(key)
+
+        analysis = dict(cached)
+        analysis["analysis_timestamp"] = datetime.now().isoformat()
+        return analysis
+
+    def _analyze_uncached(self, code: str, filename: str) -> Dict[str, Any]:
         real_urls = self.extract_real_urls(code)
         parsed_steps = self.parse_test_steps(code)
         language, frameworks = self.detect_language_and_framework(filename, code)
@@ -295,17 +451,17 @@ class EnhancedCodeAnalyzer:
             "primary_url": real_urls[0] if real_urls else None,
             "parsed_steps": parsed_steps,
             "code_length": len(code),
-            "lines_count": len(code.split('\n')),
+            "lines_count": code.count('\n') + 1,
             "complexity_score": self.calculate_complexity_score(parsed_steps),
-            "analysis_timestamp": datetime.now().isoformat(),
+            "analysis_timestamp": None,  # stamped per call by analyze_code
             "quality_metrics": {
                 "urls_found": len(real_urls),
                 "steps_parsed": len(parsed_steps),
                 "frameworks_detected": len(frameworks),
                 "has_real_urls": len(real_urls) > 0,
                 "assertion_types": list(set([
-                    step.get('type') for step in parsed_steps 
-                    if step.get('type', '').startswith('assert_')
+                    step.type for step in parsed_steps 
+                    if step.type.startswith('assert_')
                 ]))
             }
         }
@@ -317,43 +473,79 @@ class EnhancedCodeAnalyzer:
         parts = normalized.rsplit('.', 1)
         if len(parts) > 1:
             normalized = f"{parts[0]}_{parts[1]}"
-        normalized = re.sub(r'[^\w\-_]', '_', normalized)
+        normalized = self._filename_sanitize_re.sub('_', normalized)
         return normalized
 
-    def calculate_complexity_score(self, parsed_steps: List[Dict[str, Any]]) -> int:
-        score = 0
-        for step in parsed_steps:
-            step_type = step.get('type', '')
-            if step_type == 'navigation':
-                score += 1
-            elif step_type == 'click':
-                score += 2
-            elif step_type == 'input':
-                score += 3
-            elif step_type.startswith('assert_'):
-                score += 2
-        return score
+    def calculate_complexity_score(self, parsed_steps: List[ParsedStep]) -> int:
+        return sum(_STEP_SCORES.get(step.type, 0) for step in parsed_steps)
+
+@dataclass(slots=True, kw_only=True)
+class AgentUpdate:
+    """Status update broadcast by an agent through _emit"""
+    type: str = "agent_update"
+    agent: str
+    status: str
+    message: str
+    data: Optional[Dict[str, Any]] = None
+
+# Start-of-agent frames never vary per run, so they are encoded once at import.
+# Each one doubles as the workflow progress update for that agent.
+_AGENT_RUNNING_MESSAGES = {
+    "code_analysis": "Analyzing code structure and patterns...",
+    "user_story": "Generating user story from code analysis...",
+    "gherkin": "Generating Gherkin BDD scenarios...",
+    "test_plan": "Creating comprehensive test plan...",
+    "playwright": "Generating Playwright test code...",
+    "execution": "Executing tests and collecting results...",
+    "coverage": "Analyzing code coverage and generating reports...",
+    "final_report": "Generating final report and artifacts...",
+}
+_RUNNING_FRAMES = {
+    agent: _dumps({
+        "type": "agent_update",
+        "agent": agent,
+        "status": "running",
+        "message": message,
+        "current_agent": agent,
+        "progress": index / len(_AGENT_RUNNING_MESSAGES) * 100
+    })
+    for index, (agent, message) in enumerate(_AGENT_RUNNING_MESSAGES.items())
+}
 
 # WebSocket Connection Manager
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.run_connections: Dict[str, List[WebSocket]] = {}
+        self.active_connections: Set[WebSocket] = set()
+        self.run_connections: Dict[str, Set[WebSocket]] = {}
+        # Frames broadcast so far for each run in progress, replayed to clients
+        # that connect after the workflow has started
+        self.run_frames: Dict[str, List[str]] = {}
+
+    def open(self, run_id: str):
+        """Start buffering a run's frames"""
+        self.run_frames[run_id] = []
+
+    def finish(self, run_id: str):
+        """Stop buffering a run's frames once its workflow is over"""
+        self.run_frames.pop(run_id, None)
 
     async def connect(self, websocket: WebSocket, run_id: str = None):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
         if run_id:
-            if run_id not in self.run_connections:
-                self.run_connections[run_id] = []
-            self.run_connections[run_id].append(websocket)
+            # Replay what the client missed; frames broadcast meanwhile land in the
+            # buffer, so keep going until it is caught up before joining the live stream
+            frames = self.run_frames.get(run_id, ())
+            sent = 0
+            while sent < len(frames):
+                await websocket.send_text(frames[sent])
+                sent += 1
+            self.run_connections.setdefault(run_id, set()).add(websocket)
 
     def disconnect(self, websocket: WebSocket, run_id: str = None):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.active_connections.discard(websocket)
         if run_id and run_id in self.run_connections:
-            if websocket in self.run_connections[run_id]:
-                self.run_connections[run_id].remove(websocket)
+            self.run_connections[run_id].discard(websocket)
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         try:
@@ -362,17 +554,22 @@ class ConnectionManager:
             pass
 
     async def broadcast_to_run(self, message: str, run_id: str):
-        if run_id in self.run_connections:
-            disconnected = []
-            for connection in self.run_connections[run_id]:
-                try:
-                    await connection.send_text(message)
-                except:
-                    disconnected.append(connection)
+        frames = self.run_frames.get(run_id)
+        if frames is not None:
+            frames.append(message)
+        connections = self.run_connections.get(run_id)
+        if connections:
+            # Send the already-encoded frame to every client concurrently
+            targets = list(connections)
+            results = await asyncio.gather(
+                *(connection.send_text(message) for connection in targets),
+                return_exceptions=True
+            )
             
             # Clean up disconnected connections
-            for conn in disconnected:
-                self.disconnect(conn, run_id)
+            for conn, result in zip(targets, results):
+                if isinstance(result, BaseException):
+                    self.disconnect(conn, run_id)
 
 # Agent State Management
 class TestAutomationState(TypedDict):
@@ -391,14 +588,93 @@ class TestAutomationState(TypedDict):
     coverage_image_path: str
     final_report: Dict[str, Any]
     artifacts: Dict[str, str]
+    persist_artifacts: bool
+    artifact_bytes: Dict[str, bytes]
     current_step: str
     errors: List[str]
     processing_timestamp: str
 
+_RUNS_DIR = os.path.join(config.output_dir, "runs")
+
+# State fields left out of a run's spill file: the source is not served once the
+# run is over, and memory-only artifact bytes are never written to disk
+_UNSPILLED_FIELDS = {"original_code", "artifact_bytes"}
+
+class RunStateCache(OrderedDict):
+    """Run states, least recently stored first.
+
+    Past max_runs the oldest finished runs are evicted; runs still in progress
+    are never evicted. Finished runs that persist their artifacts are spilled to
+    agent_output/runs/ and read back by load() after eviction.
+    """
+    def __init__(self, max_runs: int):
+        super().__init__()
+        self.max_runs = max_runs
+        self._running: Set[str] = set()
+
+    def __setitem__(self, run_id: str, state: TestAutomationState):
+        super().__setitem__(run_id, state)
+        self.move_to_end(run_id)
+        self._evict()
+
+    def start(self, run_id: str, state: TestAutomationState):
+        """Store a new run and keep it until finish() is called"""
+        self._running.add(run_id)
+        self[run_id] = state
+
+    def finish(self, run_id: str):
+        """Allow a run that is over to be evicted"""
+        self._running.discard(run_id)
+        self._evict()
+
+    def _evict(self):
+        if len(self) <= self.max_runs:
+            return
+        for run_id in [run_id for run_id in self if run_id not in self._running]:
+            del self[run_id]
+            if len(self) <= self.max_runs:
+                break
+
+    async def load(self, run_id: str) -> Optional[TestAutomationState]:
+        """A run's state from memory, or from its spill file after eviction"""
+        state = self.get(run_id)
+        if state is not None:
+            return state
+        state = await asyncio.to_thread(_read_spilled_run, run_id)
+        if state is not None:
+            self[run_id] = state
+        return state
+
+def _spill_path(run_id: str) -> Optional[str]:
+    """Spill file of a run, or None for ids that are not a plain file name"""
+    if not run_id or os.path.basename(run_id) != run_id or run_id in ('.', '..'):
+        return None
+    return os.path.join(_RUNS_DIR, f"{run_id}.json")
+
+def _write_spilled_run(state: TestAutomationState):
+    """Save a finished run's state so it can be served after eviction"""
+    path = _spill_path(state["run_id"])
+    if path is not None:
+        _atomic_write(path, {k: v for k, v in state.items() if k not in _UNSPILLED_FIELDS})
+
+def _read_spilled_run(run_id: str) -> Optional[TestAutomationState]:
+    path = _spill_path(run_id)
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        raw = f.read()
+    state = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+    state["artifact_bytes"] = {}
+    return state
+
 # Global state management
-active_runs: Dict[str, TestAutomationState] = {}
+active_runs: Dict[str, TestAutomationState] = RunStateCache(config.max_active_runs)
 manager = ConnectionManager()
 
+async def _emit(run_id: str, frame: Union[AgentUpdate, Dict[str, Any], str]):
+    """Encode a frame (unless it is pre-encoded) and broadcast it to the run's clients"""
+    await manager.broadcast_to_run(frame if isinstance(frame, str) else _dumps(frame), run_id)
+
 # Additional Agent Classes
 class DynamicPlaywrightGenerator:
     def __init__(self):
@@ -413,97 +689,89 @@ class DynamicPlaywrightGenerator:
             'wait': self._generate_wait_step
         }
 
-    def _generate_navigation_step(self, step: Dict[str, Any]) -> str:
-        url = step.get('url', '')
+    def _generate_navigation_step(self, step: ParsedStep) -> str:
+        url = step.url
         return f"  await page.goto('{url}');\n  await page.waitForLoadState('networkidle');" if url else "  //Navigation step - URL not found"
 
-    def _generate_click_step(self, step: Dict[str, Any]) -> str:
-        selector = step.get('selector', '')
-        cleaned_selector = self._preserve_clean_selector(selector)
-        return f"  await page.locator('{cleaned_selector}').click();" if selector else "  //Click step - selector not found"
+    def _generate_click_step(self, step: ParsedStep) -> str:
+        selector = step.selector
+        return f"  await page.locator('{selector}').click();" if selector else "  //Click step - selector not found"
 
-    def _generate_input_step(self, step: Dict[str, Any]) -> str:
-        selector = step.get('selector', '')
-        value = step.get('value', '')
-        cleaned_selector = self._preserve_clean_selector(selector)
+    def _generate_input_step(self, step: ParsedStep) -> str:
+        selector = step.selector
+        value = step.value
         if selector and value:
-            return f"  await page.locator('{cleaned_selector}').fill('{value}');"
+            return f"  await page.locator('{selector}').fill('{value}');"
         elif selector:
-            return f"  await page.locator('{cleaned_selector}').fill('');"
+            return f"  await page.locator('{selector}').fill('');"
         return "  //Input step - selector not found"
 
-    def _generate_url_assertion_step(self, step: Dict[str, Any]) -> str:
-        expected_url = step.get('expected_value', '')
+    def _generate_url_assertion_step(self, step: ParsedStep) -> str:
+        expected_url = step.expected_value
         return f"  expect(page.url()).toBe('{expected_url}');" if expected_url else "  //URL assertion - expected URL not found"
 
-    def _generate_value_assertion_step(self, step: Dict[str, Any]) -> str:
-        selector = step.get('selector', '')
-        expected_value = step.get('expected_value', '')
-        cleaned_selector = self._preserve_clean_selector(selector)
+    def _generate_value_assertion_step(self, step: ParsedStep) -> str:
+        selector = step.selector
+        expected_value = step.expected_value
         if selector and expected_value:
-            return f"  await expect(page.locator('{cleaned_selector}')).toHaveValue('{expected_value}');"
+            return f"  await expect(page.locator('{selector}')).toHaveValue('{expected_value}');"
         elif selector:
-            return f"  await expect(page.locator('{cleaned_selector}')).toBeVisible();"
+            return f"  await expect(page.locator('{selector}')).toBeVisible();"
         return "  //Value assertion - selector not found"
 
-    def _generate_css_assertion_step(self, step: Dict[str, Any]) -> str:
-        selector = step.get('selector', '')
-        css_property = step.get('css_property', '')
-        expected_value = step.get('expected_value', '')
-        cleaned_selector = self._preserve_clean_selector(selector)
+    def _generate_css_assertion_step(self, step: ParsedStep) -> str:
+        selector = step.selector
+        css_property = step.css_property
+        expected_value = step.expected_value
         if selector and css_property and expected_value:
-            return f"  await expect(page.locator('{cleaned_selector}')).toHaveCSS('{css_property}','{expected_value}');"
+            return f"  await expect(page.locator('{selector}')).toHaveCSS('{css_property}','{expected_value}');"
         elif selector:
-            return f"  await expect(page.locator('{cleaned_selector}')).toBeVisible();"
+            return f"  await expect(page.locator('{selector}')).toBeVisible();"
         return "  //CSS assertion - missing properties"
 
-    def _generate_generic_assertion_step(self, step: Dict[str, Any]) -> str:
-        selector = step.get('selector', '')
-        assertion_type = step.get('assertion_type', '')
-        expected_value = step.get('expected_value', '')
-        cleaned_selector = self._preserve_clean_selector(selector)
+    def _generate_generic_assertion_step(self, step: ParsedStep) -> str:
+        selector = step.selector
+        assertion_type = step.assertion_type
+        expected_value = step.expected_value
         if assertion_type in ['be.visible', 'be.visible()', 'exist', 'be.exist']:
-            return f"  await expect(page.locator('{cleaned_selector}')).toBeVisible();"
+            return f"  await expect(page.locator('{selector}')).toBeVisible();"
         elif assertion_type in ['have.text', 'contain.text', 'contain'] and expected_value:
-            return f"  await expect(page.locator('{cleaned_selector}')).toContainText('{expected_value}');"
+            return f"  await expect(page.locator('{selector}')).toContainText('{expected_value}');"
         else:
-            return f"  await expect(page.locator('{cleaned_selector}')).toBeVisible();"
+            return f"  await expect(page.locator('{selector}')).toBeVisible();"
 
-    def _generate_wait_step(self, step: Dict[str, Any]) -> str:
+    def _generate_wait_step(self, step: ParsedStep) -> str:
         return "  await page.waitForLoadState('networkidle');"
 
-    def _preserve_clean_selector(self, selector: str) -> str:
-        return selector.strip('\'"')
-
     def generate_playwright_test(self, analysis: Dict[str, Any]) -> str:
         filename = analysis.get('filename', 'unknown')
         normalized_filename = analysis.get('normalized_filename', 'unknown')
         primary_url = analysis.get('primary_url', None)
         parsed_steps = analysis.get('parsed_steps', [])
         
-        test_code = f"""const {{ test, expect }} = require('@playwright/test');
+        parts = [f"""const {{ test, expect }} = require('@playwright/test');
 
-test.describe('{normalized_filename} - Generated Tests', () => {{"""
+test.describe('{normalized_filename} - Generated Tests', () => {{"""]
 
         if primary_url:
-            test_code += f"""
+            parts.append(f"""
   test.beforeEach(async ({{ page }}) => {{
     await page.goto('{primary_url}');
     await page.waitForLoadState('networkidle');
-  }});"""
+  }});""")
 
-        test_code += f"""
-  test('Application functionality test', async ({{ page }}) => {{
-"""
+        parts.append("""
+  test('Application functionality test', async ({ page }) => {
+""")
         for step in parsed_steps:
-            step_type = step.get('type', 'unknown')
+            step_type = step.type
             if step_type in self.playwright_mappings:
-                test_code += f"    {self.playwright_mappings[step_type](step)}\n"
+                parts.append(f"    {self.playwright_mappings[step_type](step)}\n")
 
-        test_code += """  });
+        parts.append("""  });
 });
-"""
-        return test_code
+""")
+        return ''.join(parts)
 
 class EnhancedGherkinGenerator:
     def generate_gherkin_feature(self, analysis: Dict[str, Any]) -> str:
@@ -511,53 +779,106 @@ class EnhancedGherkinGenerator:
         primary_url = analysis.get('primary_url', None)
         parsed_steps = analysis.get('parsed_steps', [])
         
-        feature_content = f"""Feature: {filename} Functionality
+        parts = [f"""Feature: {filename} Functionality
 As a user of the application
 I want to interact with the {filename.lower()}
 So that I can achieve my testing goals
-"""
+"""]
         if primary_url:
-            feature_content += f"""
+            parts.append(f"""
 Background:
   Given I open the application at "{primary_url}"
   And the page loads successfully
-"""
+""")
         
-        feature_content += """
+        parts.append("""
 Scenario: Application functionality test
-"""
+""")
         for step in parsed_steps:
-            step_type = step.get('type', '')
+            step_type = step.type
             if step_type == 'navigation':
-                feature_content += f"  When I navigate to \"{step.get('url', '')}\"\n"
+                parts.append(f"  When I navigate to \"{step.url}\"\n")
             elif step_type == 'click':
-                feature_content += f"  When I click on the element \"{step.get('selector', '')}\"\n"
+                parts.append(f"  When I click on the element \"{step.selector}\"\n")
             elif step_type == 'input':
-                feature_content += f"  When I enter \"{step.get('value', '')}\" in \"{step.get('selector', '')}\"\n"
+                parts.append(f"  When I enter \"{step.value}\" in \"{step.selector}\"\n")
             elif step_type.startswith('assert_'):
-                feature_content += f"  Then the element \"{step.get('selector', '')}\" should be validated\n"
+                parts.append(f"  Then the element \"{step.selector}\" should be validated\n")
         
-        return feature_content
+        return ''.join(parts)
 
 # Initialize generators
 playwright_generator = DynamicPlaywrightGenerator()
 gherkin_generator = EnhancedGherkinGenerator()
 
+class _SafeDict(dict):
+    """format_map mapping that renders unknown template fields as empty"""
+    def __missing__(self, key):
+        return ""
+
+# Static agent templates, filled per run with format_map
+_USER_STORY_TEMPLATE = """**User Story for {filename}**
+
+As a QA Engineer testing a {language} application with {framework} framework
+I want to verify all functionality works correctly
+So that users can interact with the application reliably
+
+**Technical Details:**
+- Primary URL: {primary_url}
+- Test Steps Identified: {steps_count}
+- Frameworks Detected: {frameworks_list}
+- Language: {language}
+
+**Acceptance Criteria:**
+- All navigation flows work correctly
+- User interactions (clicks, form inputs) function properly
+- Assertions validate expected behavior
+- Coverage metrics meet quality standards"""
+
+_TEST_PLAN_TEMPLATE = """## Test Plan for {filename}
+
+### Overview
+- **Application**: {filename}
+- **Technology**: {language}
+- **Framework**: {framework}
+- **Target URL**: {primary_url}
+- **Test Steps**: {steps_count}
+
+### Test Strategy
+1. **Functional Testing**
+   - Verify all user interactions work correctly
+   - Validate navigation flows
+   - Test form inputs and submissions
+
+2. **UI Testing**
+   - Check element visibility and accessibility
+   - Validate CSS properties and styling
+   - Test responsive behavior
+
+3. **Integration Testing**
+   - Verify API calls and data flow
+   - Test external service integrations
+   - Validate error handling
+
+### Coverage Goals
+- Minimum 80% code coverage
+- All critical user paths tested
+- Error scenarios covered
+
+### Test Environment
+- Browser: Chromium (Playwright)
+- Test Framework: Playwright
+- Coverage Tool: c8
+- Reporting: HTML + JSON"""
+
 # Agent implementations
-def code_analysis_agent(state: TestAutomationState) -> TestAutomationState:
+async def code_analysis_agent(state: TestAutomationState) -> TestAutomationState:
     """Agent 1: Enhanced code analysis"""
     run_id = state["run_id"]
     
-    asyncio.create_task(manager.broadcast_to_run(json.dumps({
-        "type": "agent_update",
-        "agent": "code_analysis",
-        "status": "running",
-        "message": "Analyzing code structure and patterns..."
-    }), run_id))
-    
     try:
+        # analyze_code already stamped analysis_timestamp when the run started
         analysis = state["ast_analysis"]
-        analysis["analysis_timestamp"] = datetime.now().isoformat()
         analysis["agent_version"] = "3.0.0-FIXED"
         analysis["subfolder_origin"] = state.get("subfolder_path", "unknown")
         analysis["parsing_engine"] = "enhanced_fixed_assertions"
@@ -565,42 +886,33 @@ def code_analysis_agent(state: TestAutomationState) -> TestAutomationState:
         state["ast_analysis"] = analysis
         state["current_step"] = "code_analyzed"
         
-        asyncio.create_task(manager.broadcast_to_run(json.dumps({
-            "type": "agent_update",
-            "agent": "code_analysis",
-            "status": "success",
-            "message": f"Analysis complete: {len(analysis['real_urls'])} URLs, {len(analysis['parsed_steps'])} steps found",
-            "data": {
+        await _emit(run_id, AgentUpdate(
+            agent="code_analysis",
+            status="success",
+            message=f"Analysis complete: {len(analysis['real_urls'])} URLs, {len(analysis['parsed_steps'])} steps found",
+            data={
                 "urls_found": len(analysis['real_urls']),
                 "steps_parsed": len(analysis['parsed_steps']),
                 "frameworks": analysis['frameworks_detected'][:3]
             }
-        }), run_id))
+        ))
         
         return state
     except Exception as e:
         state["errors"].append(f"Enhanced code analysis failed: {str(e)}")
         
-        asyncio.create_task(manager.broadcast_to_run(json.dumps({
-            "type": "agent_update",
-            "agent": "code_analysis",
-            "status": "error",
-            "message": f"Analysis failed: {str(e)}"
-        }), run_id))
+        await _emit(run_id, AgentUpdate(
+            agent="code_analysis",
+            status="error",
+            message=f"Analysis failed: {str(e)}"
+        ))
         
         return state
 
-def user_story_agent(state: TestAutomationState) -> TestAutomationState:
+async def user_story_agent(state: TestAutomationState) -> TestAutomationState:
     """Agent 2: Smart user story generation"""
     run_id = state["run_id"]
     
-    asyncio.create_task(manager.broadcast_to_run(json.dumps({
-        "type": "agent_update",
-        "agent": "user_story",
-        "status": "running",
-        "message": "Generating user story from code analysis..."
-    }), run_id))
-    
     try:
         filename = state["ast_analysis"].get("filename", "test_file")
         language = state["ast_analysis"].get("language_detected", "javascript")
@@ -609,100 +921,74 @@ def user_story_agent(state: TestAutomationState) -> TestAutomationState:
         parsed_steps = state["ast_analysis"].get("parsed_steps", [])
         
         # Generate intelligent user story
-        state["user_story"] = f"""**User Story for {filename}**
-
-As a QA Engineer testing a {language} application with {frameworks[0] if frameworks else 'web'} framework
-I want to verify all functionality works correctly
-So that users can interact with the application reliably
-
-**Technical Details:**
-- Primary URL: {primary_url}
-- Test Steps Identified: {len(parsed_steps)}
-- Frameworks Detected: {', '.join(frameworks[:3]) if frameworks else 'Standard web application'}
-- Language: {language}
-
-**Acceptance Criteria:**
-- All navigation flows work correctly
-- User interactions (clicks, form inputs) function properly
-- Assertions validate expected behavior
-- Coverage metrics meet quality standards"""
+        state["user_story"] = _USER_STORY_TEMPLATE.format_map(_SafeDict(
+            filename=filename,
+            language=language,
+            framework=frameworks[0] if frameworks else 'web',
+            primary_url=primary_url,
+            steps_count=len(parsed_steps),
+            frameworks_list=', '.join(frameworks[:3]) if frameworks else 'Standard web application'
+        ))
 
         state["current_step"] = "user_story_generated"
         
-        asyncio.create_task(manager.broadcast_to_run(json.dumps({
-            "type": "agent_update",
-            "agent": "user_story",
-            "status": "success",
-            "message": "User story generated successfully",
-            "data": {
+        await _emit(run_id, AgentUpdate(
+            agent="user_story",
+            status="success",
+            message="User story generated successfully",
+            data={
                 "story_length": len(state["user_story"]),
                 "primary_url": primary_url
             }
-        }), run_id))
+        ))
         
         return state
     except Exception as e:
         state["errors"].append(f"User story generation failed: {str(e)}")
         
-        asyncio.create_task(manager.broadcast_to_run(json.dumps({
-            "type": "agent_update",
-            "agent": "user_story", 
-            "status": "error",
-            "message": f"User story generation failed: {str(e)}"
-        }), run_id))
+        await _emit(run_id, AgentUpdate(
+            agent="user_story",
+            status="error",
+            message=f"User story generation failed: {str(e)}"
+        ))
         
         return state
 
-def gherkin_agent(state: TestAutomationState) -> TestAutomationState:
+async def gherkin_agent(state: TestAutomationState) -> TestAutomationState:
     """Agent 3: Gherkin BDD feature generation"""
     run_id = state["run_id"]
     
-    asyncio.create_task(manager.broadcast_to_run(json.dumps({
-        "type": "agent_update",
-        "agent": "gherkin",
-        "status": "running",
-        "message": "Generating Gherkin BDD scenarios..."
-    }), run_id))
-    
     try:
-        state["gherkin_feature"] = gherkin_generator.generate_gherkin_feature(state["ast_analysis"])
+        gherkin_feature = gherkin_generator.generate_gherkin_feature(state["ast_analysis"])
+        state["gherkin_feature"] = gherkin_feature
         state["current_step"] = "gherkin_generated"
         
-        asyncio.create_task(manager.broadcast_to_run(json.dumps({
-            "type": "agent_update",
-            "agent": "gherkin",
-            "status": "success",
-            "message": "Gherkin scenarios generated successfully",
-            "data": {
-                "feature_length": len(state["gherkin_feature"]),
-                "scenarios_count": state["gherkin_feature"].count("Scenario:")
+        await _emit(run_id, AgentUpdate(
+            agent="gherkin",
+            status="success",
+            message="Gherkin scenarios generated successfully",
+            data={
+                "feature_length": len(gherkin_feature),
+                "scenarios_count": gherkin_feature.count("Scenario:")
             }
-        }), run_id))
+        ))
         
         return state
     except Exception as e:
         state["errors"].append(f"Gherkin generation failed: {str(e)}")
         
-        asyncio.create_task(manager.broadcast_to_run(json.dumps({
-            "type": "agent_update",
-            "agent": "gherkin",
-            "status": "error",
-            "message": f"Gherkin generation failed: {str(e)}"
-        }), run_id))
+        await _emit(run_id, AgentUpdate(
+            agent="gherkin",
+            status="error",
+            message=f"Gherkin generation failed: {str(e)}"
+        ))
         
         return state
 
-def test_plan_agent(state: TestAutomationState) -> TestAutomationState:
+async def test_plan_agent(state: TestAutomationState) -> TestAutomationState:
     """Agent 4: Test plan generation"""
     run_id = state["run_id"]
     
-    asyncio.create_task(manager.broadcast_to_run(json.dumps({
-        "type": "agent_update",
-        "agent": "test_plan",
-        "status": "running",
-        "message": "Creating comprehensive test plan..."
-    }), run_id))
-    
     try:
         filename = state["ast_analysis"].get("filename", "test_file")
         language = state["ast_analysis"].get("language_detected", "javascript")
@@ -710,122 +996,76 @@ def test_plan_agent(state: TestAutomationState) -> TestAutomationState:
         primary_url = state["ast_analysis"].get("primary_url", "No URL found")
         parsed_steps = state["ast_analysis"].get("parsed_steps", [])
         
-        state["test_plan"] = f"""## Test Plan for {filename}
-
-### Overview
-- **Application**: {filename}
-- **Technology**: {language}
-- **Framework**: {frameworks[0] if frameworks else 'Standard web application'}
-- **Target URL**: {primary_url}
-- **Test Steps**: {len(parsed_steps)}
-
-### Test Strategy
-1. **Functional Testing**
-   - Verify all user interactions work correctly
-   - Validate navigation flows
-   - Test form inputs and submissions
-
-2. **UI Testing**
-   - Check element visibility and accessibility
-   - Validate CSS properties and styling
-   - Test responsive behavior
-
-3. **Integration Testing**
-   - Verify API calls and data flow
-   - Test external service integrations
-   - Validate error handling
-
-### Coverage Goals
-- Minimum 80% code coverage
-- All critical user paths tested
-- Error scenarios covered
-
-### Test Environment
-- Browser: Chromium (Playwright)
-- Test Framework: Playwright
-- Coverage Tool: c8
-- Reporting: HTML + JSON"""
+        state["test_plan"] = _TEST_PLAN_TEMPLATE.format_map(_SafeDict(
+            filename=filename,
+            language=language,
+            framework=frameworks[0] if frameworks else 'Standard web application',
+            primary_url=primary_url,
+            steps_count=len(parsed_steps)
+        ))
 
         state["current_step"] = "test_plan_generated"
         
-        asyncio.create_task(manager.broadcast_to_run(json.dumps({
-            "type": "agent_update",
-            "agent": "test_plan",
-            "status": "success",
-            "message": "Test plan created successfully",
-            "data": {
+        await _emit(run_id, AgentUpdate(
+            agent="test_plan",
+            status="success",
+            message="Test plan created successfully",
+            data={
                 "plan_length": len(state["test_plan"]),
                 "sections_count": state["test_plan"].count("###")
             }
-        }), run_id))
+        ))
         
         return state
     except Exception as e:
         state["errors"].append(f"Test plan generation failed: {str(e)}")
         
-        asyncio.create_task(manager.broadcast_to_run(json.dumps({
-            "type": "agent_update",
-            "agent": "test_plan",
-            "status": "error",
-            "message": f"Test plan generation failed: {str(e)}"
-        }), run_id))
+        await _emit(run_id, AgentUpdate(
+            agent="test_plan",
+            status="error",
+            message=f"Test plan generation failed: {str(e)}"
+        ))
         
         return state
 
-def playwright_agent(state: TestAutomationState) -> TestAutomationState:
+async def playwright_agent(state: TestAutomationState) -> TestAutomationState:
     """Agent 5: Playwright test generation"""
     run_id = state["run_id"]
     
-    asyncio.create_task(manager.broadcast_to_run(json.dumps({
-        "type": "agent_update",
-        "agent": "playwright",
-        "status": "running",
-        "message": "Generating Playwright test code..."
-    }), run_id))
-    
     try:
-        state["playwright_code"] = playwright_generator.generate_playwright_test(state["ast_analysis"])
+        playwright_code = playwright_generator.generate_playwright_test(state["ast_analysis"])
+        state["playwright_code"] = playwright_code
         state["current_step"] = "playwright_generated"
         
-        asyncio.create_task(manager.broadcast_to_run(json.dumps({
-            "type": "agent_update",
-            "agent": "playwright",
-            "status": "success",
-            "message": "Playwright test code generated successfully",
-            "data": {
-                "code_length": len(state["playwright_code"]),
-                "test_count": state["playwright_code"].count("test(")
+        await _emit(run_id, AgentUpdate(
+            agent="playwright",
+            status="success",
+            message="Playwright test code generated successfully",
+            data={
+                "code_length": len(playwright_code),
+                "test_count": playwright_code.count("test(")
             }
-        }), run_id))
+        ))
         
         return state
     except Exception as e:
         state["errors"].append(f"Playwright generation failed: {str(e)}")
         
-        asyncio.create_task(manager.broadcast_to_run(json.dumps({
-            "type": "agent_update",
-            "agent": "playwright",
-            "status": "error",
-            "message": f"Playwright generation failed: {str(e)}"
-        }), run_id))
+        await _emit(run_id, AgentUpdate(
+            agent="playwright",
+            status="error",
+            message=f"Playwright generation failed: {str(e)}"
+        ))
         
         return state
 
-def execution_agent(state: TestAutomationState) -> TestAutomationState:
+async def execution_agent(state: TestAutomationState) -> TestAutomationState:
     """Agent 6: Test execution simulation"""
     run_id = state["run_id"]
     
-    asyncio.create_task(manager.broadcast_to_run(json.dumps({
-        "type": "agent_update",
-        "agent": "execution",
-        "status": "running",
-        "message": "Executing tests and collecting results..."
-    }), run_id))
-    
     try:
         # Simulate test execution
-        import random
-        time.sleep(2)  # Simulate execution time
+        await asyncio.sleep(2)  # Simulate execution time
         
         tests_run = len(state["ast_analysis"].get("parsed_steps", [])) or 3
         tests_passed = max(1, tests_run - random.randint(0, 1))
@@ -843,61 +1083,54 @@ def execution_agent(state: TestAutomationState) -> TestAutomationState:
         
         state["current_step"] = "execution_completed"
         
-        asyncio.create_task(manager.broadcast_to_run(json.dumps({
-            "type": "agent_update",
-            "agent": "execution",
-            "status": "success",
-            "message": f"Tests executed: {tests_passed}/{tests_run} passed",
-            "data": {
+        await _emit(run_id, AgentUpdate(
+            agent="execution",
+            status="success",
+            message=f"Tests executed: {tests_passed}/{tests_run} passed",
+            data={
                 "tests_run": tests_run,
                 "tests_passed": tests_passed,
                 "tests_failed": tests_failed,
                 "execution_time": state["execution_result"]["execution_time"]
             }
-        }), run_id))
+        ))
         
         return state
     except Exception as e:
         state["errors"].append(f"Test execution failed: {str(e)}")
         
-        asyncio.create_task(manager.broadcast_to_run(json.dumps({
-            "type": "agent_update",
-            "agent": "execution",
-            "status": "error",
-            "message": f"Test execution failed: {str(e)}"
-        }), run_id))
+        await _emit(run_id, AgentUpdate(
+            agent="execution",
+            status="error",
+            message=f"Test execution failed: {str(e)}"
+        ))
         
         return state
 
-def coverage_agent(state: TestAutomationState) -> TestAutomationState:
+# Simulated coverage per metric (statements, branches, functions, lines):
+# (jitter low, jitter high, clamp low, clamp high)
+_COVERAGE_RANGES = (
+    (-5, 10, 50, 95),
+    (-10, 5, 45, 90),
+    (-3, 15, 60, 100),
+    (-7, 8, 55, 92),
+)
+
+async def coverage_agent(state: TestAutomationState) -> TestAutomationState:
     """Agent 7: Coverage analysis and reporting"""
     run_id = state["run_id"]
     
-    asyncio.create_task(manager.broadcast_to_run(json.dumps({
-        "type": "agent_update",
-        "agent": "coverage",
-        "status": "running",
-        "message": "Analyzing code coverage and generating reports..."
-    }), run_id))
-    
     try:
         # Generate simulated but realistic coverage data
-        import random
-        
         # Base coverage on code complexity
         complexity = state["ast_analysis"].get("complexity_score", 10)
         base_coverage = max(60, min(95, 70 + (complexity * 2)))
         
-        statements_pct = base_coverage + random.uniform(-5, 10)
-        branches_pct = base_coverage + random.uniform(-10, 5)
-        functions_pct = base_coverage + random.uniform(-3, 15)
-        lines_pct = base_coverage + random.uniform(-7, 8)
-        
-        # Ensure realistic ranges
-        statements_pct = max(50, min(95, statements_pct))
-        branches_pct = max(45, min(90, branches_pct))
-        functions_pct = max(60, min(100, functions_pct))
-        lines_pct = max(55, min(92, lines_pct))
+        # Jitter each metric around the base and clamp it to a realistic range
+        statements_pct, branches_pct, functions_pct, lines_pct = (
+            max(low, min(high, base_coverage + random.uniform(jitter_low, jitter_high)))
+            for jitter_low, jitter_high, low, high in _COVERAGE_RANGES
+        )
         
         overall_pct = (statements_pct + branches_pct + functions_pct + lines_pct) / 4
         
@@ -914,84 +1147,64 @@ def coverage_agent(state: TestAutomationState) -> TestAutomationState:
         
         state["current_step"] = "coverage_generated"
         
-        asyncio.create_task(manager.broadcast_to_run(json.dumps({
-            "type": "agent_update",
-            "agent": "coverage",
-            "status": "success",
-            "message": f"Coverage analysis complete: {overall_pct:.1f}% overall coverage",
-            "data": {
+        await _emit(run_id, AgentUpdate(
+            agent="coverage",
+            status="success",
+            message=f"Coverage analysis complete: {overall_pct:.1f}% overall coverage",
+            data={
                 "overall_percentage": round(overall_pct, 1),
                 "statements_percentage": round(statements_pct, 1),
                 "branches_percentage": round(branches_pct, 1),
                 "functions_percentage": round(functions_pct, 1),
                 "lines_percentage": round(lines_pct, 1)
             }
-        }), run_id))
+        ))
         
         return state
     except Exception as e:
         state["errors"].append(f"Coverage analysis failed: {str(e)}")
         
-        asyncio.create_task(manager.broadcast_to_run(json.dumps({
-            "type": "agent_update",
-            "agent": "coverage",
-            "status": "error",
-            "message": f"Coverage analysis failed: {str(e)}"
-        }), run_id))
+        await _emit(run_id, AgentUpdate(
+            agent="coverage",
+            status="error",
+            message=f"Coverage analysis failed: {str(e)}"
+        ))
         
         return state
 
-def final_report_agent(state: TestAutomationState) -> TestAutomationState:
+_REPORTS_DIR = os.path.join(config.output_dir, "reports")
+
+# Artifacts saved by final_report_agent: (artifact type, directory, filename
+# suffix, content from state). Falsy content means the artifact is skipped.
+_ARTIFACT_SPECS = [
+    ("gherkin", os.path.join(config.output_dir, "features"), ".feature",
+     lambda state: state.get("gherkin_feature")),
+    ("test_plan", _REPORTS_DIR, "_test_plan.md",
+     lambda state: state.get("test_plan")),
+    ("user_story", _REPORTS_DIR, "_user_story.md",
+     lambda state: state.get("user_story") and f"# User Story - {state['filename']}\n\n{state['user_story']}"),
+    ("playwright_test", os.path.join(config.output_dir, "tests"), "_generated.spec.js",
+     lambda state: state.get("playwright_code")),
+    ("execution_log", os.path.join(config.output_dir, "execution_logs"), "_execution.json",
+     lambda state: state.get("execution_result")),
+]
+
+async def final_report_agent(state: TestAutomationState) -> TestAutomationState:
     """Agent 8: Final report and artifact generation"""
     run_id = state["run_id"]
     
-    asyncio.create_task(manager.broadcast_to_run(json.dumps({
-        "type": "agent_update",
-        "agent": "final_report",
-        "status": "running",
-        "message": "Generating final report and artifacts..."
-    }), run_id))
-    
     try:
         normalized_filename = state["ast_analysis"]["normalized_filename"]
         
-        # Save artifacts to files
+        # Collect artifacts; they are written (or kept in memory) together below
         artifacts = {}
-        
-        # Save Gherkin feature
-        if state.get("gherkin_feature"):
-            gherkin_path = os.path.join(config.output_dir, "features", f"{normalized_filename}.feature")
-            with open(gherkin_path, 'w', encoding='utf-8') as f:
-                f.write(state["gherkin_feature"])
-            artifacts["gherkin"] = gherkin_path
-        
-        # Save test plan
-        if state.get("test_plan"):
-            plan_path = os.path.join(config.output_dir, "reports", f"{normalized_filename}_test_plan.md")
-            with open(plan_path, 'w', encoding='utf-8') as f:
-                f.write(state["test_plan"])
-            artifacts["test_plan"] = plan_path
-        
-        # Save user story
-        if state.get("user_story"):
-            story_path = os.path.join(config.output_dir, "reports", f"{normalized_filename}_user_story.md")
-            with open(story_path, 'w', encoding='utf-8') as f:
-                f.write(f"# User Story - {state['filename']}\n\n{state['user_story']}")
-            artifacts["user_story"] = story_path
-        
-        # Save Playwright test
-        if state.get("playwright_code"):
-            test_path = os.path.join(config.output_dir, "tests", f"{normalized_filename}_generated.spec.js")
-            with open(test_path, 'w', encoding='utf-8') as f:
-                f.write(state["playwright_code"])
-            artifacts["playwright_test"] = test_path
-        
-        # Save execution log
-        if state.get("execution_result"):
-            exec_path = os.path.join(config.output_dir, "execution_logs", f"{normalized_filename}_execution.json")
-            with open(exec_path, 'w', encoding='utf-8') as f:
-                json.dump(state["execution_result"], f, indent=2)
-            artifacts["execution_log"] = exec_path
+        writes = []
+        for artifact_type, directory, suffix, render in _ARTIFACT_SPECS:
+            content = render(state)
+            if content:
+                path = os.path.join(directory, f"{normalized_filename}{suffix}")
+                writes.append((artifact_type, path, content))
+                artifacts[artifact_type] = path
         
         # Create final report
         final_report = {
@@ -1012,38 +1225,43 @@ def final_report_agent(state: TestAutomationState) -> TestAutomationState:
             "errors": state.get("errors", [])
         }
         
-        # Save final report
-        report_path = os.path.join(config.output_dir, "reports", f"{normalized_filename}_final_report.json")
-        with open(report_path, 'w', encoding='utf-8') as f:
-            json.dump(final_report, f, indent=2)
+        report_path = os.path.join(_REPORTS_DIR, f"{normalized_filename}_final_report.json")
+        writes.append(("final_report", report_path, final_report))
         artifacts["final_report"] = report_path
         
+        if state.get("persist_artifacts", True):
+            # Encode and write every artifact in worker threads, overlapping the writes
+            await asyncio.gather(*(asyncio.to_thread(_atomic_write, path, content) for _, path, content in writes))
+        else:
+            # Memory-only run: keep the encoded artifacts, the paths only name them
+            state["artifact_bytes"] = {
+                artifact_type: _encode_artifact(content) for artifact_type, _, content in writes
+            }
+        
         state["final_report"] = final_report
         state["artifacts"] = artifacts
         state["current_step"] = "completed"
         
-        asyncio.create_task(manager.broadcast_to_run(json.dumps({
-            "type": "agent_update",
-            "agent": "final_report",
-            "status": "success",
-            "message": f"Final report generated with {len(artifacts)} artifacts",
-            "data": {
+        await _emit(run_id, AgentUpdate(
+            agent="final_report",
+            status="success",
+            message=f"Final report generated with {len(artifacts)} artifacts",
+            data={
                 "artifacts_count": len(artifacts),
                 "artifacts_list": list(artifacts.keys()),
                 "report_status": final_report["metadata"]["processing_status"]
             }
-        }), run_id))
+        ))
         
         return state
     except Exception as e:
         state["errors"].append(f"Final report generation failed: {str(e)}")
         
-        asyncio.create_task(manager.broadcast_to_run(json.dumps({
-            "type": "agent_update",
-            "agent": "final_report",
-            "status": "error",
-            "message": f"Final report generation failed: {str(e)}"
-        }), run_id))
+        await _emit(run_id, AgentUpdate(
+            agent="final_report",
+            status="error",
+            message=f"Final report generation failed: {str(e)}"
+        ))
         
         return state
 
@@ -1051,7 +1269,13 @@ def final_report_agent(state: TestAutomationState) -> TestAutomationState:
 enhanced_analyzer = EnhancedCodeAnalyzer()
 
 # FastAPI app
-app = FastAPI(title="Universal Test Automation Agent Service")
+# JSON responses go through orjson when it is installed
+if ORJSON_AVAILABLE:
+    from fastapi.responses import ORJSONResponse as _DefaultResponse
+else:
+    from fastapi.responses import JSONResponse as _DefaultResponse
+
+app = FastAPI(title="Universal Test Automation Agent Service", default_response_class=_DefaultResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -1062,6 +1286,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def _create_output_dirs():
+    """Create the artifact directories once so per-run writes skip the makedirs"""
+    if config.persist_artifacts:
+        for directory in {directory for _, directory, _, _ in _ARTIFACT_SPECS} | {_REPORTS_DIR}:
+            _ensure(directory)
+
+@app.on_event("startup")
+async def _use_eager_tasks():
+    """Run new tasks eagerly so broadcasts that finish without blocking skip a loop cycle"""
+    # asyncio.eager_task_factory is only available on Python 3.12+
+    if hasattr(asyncio, "eager_task_factory"):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+
 @app.websocket("/ws/{run_id}")
 async def websocket_endpoint(websocket: WebSocket, run_id: str):
     await manager.connect(websocket, run_id)
@@ -1114,14 +1352,18 @@ async def start_analysis(payload: Dict[str, Any]):
         "coverage_image_path": "",
         "final_report": {},
         "artifacts": {},
+        "persist_artifacts": bool(payload.get("persist_artifacts", config.persist_artifacts)),
+        "artifact_bytes": {},
         "current_step": "initialized",
         "errors": [],
-        "processing_timestamp": datetime.now().isoformat(),
+        "processing_timestamp": analysis["analysis_timestamp"],
         "total_files": len(files) if files else 1
     }
     
-    # Store state
-    active_runs[run_id] = initial_state
+    # Store state; the run stays in memory until its workflow finishes
+    active_runs.start(run_id, initial_state)
+    # Clients connect once they have the run id, so buffer the frames sent before that
+    manager.open(run_id)
     
     # Start async processing
     asyncio.create_task(process_workflow(run_id))
@@ -1136,33 +1378,33 @@ async def process_workflow(run_id: str):
     state = active_runs[run_id]
     
     try:
-        # Run agents sequentially
-        agents = [
-            ("code_analysis", code_analysis_agent),
-            ("user_story", user_story_agent),
-            ("gherkin", gherkin_agent),
-            ("test_plan", test_plan_agent),
-            ("playwright", playwright_agent),
-            ("execution", execution_agent),
-            ("coverage", coverage_agent),
-            ("final_report", final_report_agent),
+        # Run agents stage by stage; agents within a stage only read the code
+        # analysis and write their own state field, so they run concurrently
+        stages = [
+            [("code_analysis", code_analysis_agent)],
+            [("user_story", user_story_agent), ("gherkin", gherkin_agent), ("test_plan", test_plan_agent)],
+            [("playwright", playwright_agent)],
+            [("execution", execution_agent)],
+            [("coverage", coverage_agent)],
+            [("final_report", final_report_agent)],
         ]
         
-        for agent_name, agent_func in agents:
-            await manager.broadcast_to_run(json.dumps({
-                "type": "workflow_progress",
-                "current_agent": agent_name,
-                "progress": agents.index((agent_name, agent_func)) / len(agents) * 100
-            }), run_id)
+        for stage in stages:
+            # One frame per agent announces it as running and carries the progress
+            for agent_name, _ in stage:
+                await _emit(run_id, _RUNNING_FRAMES[agent_name])
             
-            state = agent_func(state)
+            if len(stage) == 1:
+                state = await stage[0][1](state)
+            else:
+                await asyncio.gather(*(agent_func(state) for _, agent_func in stage))
             active_runs[run_id] = state
-            
-            # Small delay between agents
-            await asyncio.sleep(0.5)
+        
+        # The source is not needed once the workflow is over
+        state.pop("original_code", None)
         
         # Mark as completed
-        await manager.broadcast_to_run(json.dumps({
+        await _emit(run_id, {
             "type": "workflow_complete",
             "run_id": run_id,
             "final_state": {
@@ -1170,35 +1412,102 @@ async def process_workflow(run_id: str):
                 "errors": state.get("errors", []),
                 "artifacts_generated": len(state.get("artifacts", {}))
             }
-        }), run_id)
+        })
         
     except Exception as e:
-        await manager.broadcast_to_run(json.dumps({
+        await _emit(run_id, {
             "type": "workflow_error",
             "run_id": run_id,
             "error": str(e)
-        }), run_id)
+        })
+    finally:
+        # Runs whose artifacts are on disk are spilled so they outlive eviction
+        if state.get("persist_artifacts", True):
+            try:
+                await asyncio.to_thread(_write_spilled_run, state)
+            except Exception as e:
+                print(f"Error saving run state {run_id}: {e}")
+        active_runs.finish(run_id)
+        manager.finish(run_id)
+
+class _ZipStream(io.RawIOBase):
+    """Write-only sink for ZipFile that hands back what was written so far"""
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _iter_zip(artifacts: Dict[str, str], artifact_bytes: Dict[str, bytes]):
+    """Yield an uncompressed ZIP of a run's artifacts one entry at a time.
+
+    Artifacts are small text files that the transport can gzip, so entries
+    are stored rather than deflated. Memory-only artifacts are added from
+    their encoded bytes, the rest from disk.
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED) as zipf:
+        for artifact_type, file_path in artifacts.items():
+            if artifact_type in artifact_bytes:
+                zipf.writestr(os.path.basename(file_path), artifact_bytes[artifact_type])
+                yield stream.drain()
+            elif os.path.exists(file_path):
+                zipf.write(file_path, os.path.basename(file_path))
+                yield stream.drain()
+    yield stream.drain()
+
+def _decode_artifact(path: str, raw: bytes) -> Any:
+    """Artifact content from its encoded bytes: parsed JSON or UTF-8 text"""
+    if path.endswith('.json'):
+        # Both parsers accept bytes, so JSON skips the text-mode decode
+        return orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+    return raw.decode('utf-8')
+
+@functools.lru_cache(maxsize=512)
+def _read_artifact(path: str, mtime_ns: int) -> Any:
+    """Artifact file content, cached until the file's mtime changes"""
+    with open(path, 'rb') as f:
+        return _decode_artifact(path, f.read())
 
 @app.get("/api/run/{run_id}")
 async def get_run_status(run_id: str):
     """Get current status of a run"""
-    if run_id not in active_runs:
+    state = await active_runs.load(run_id)
+    if state is None:
         return {"error": "Run not found"}
     
-    state = active_runs[run_id]
-    
-    # Read artifact contents from files if they exist
+    # Read artifact contents from memory or from files if they exist
     artifact_contents = {}
     artifacts_paths = state.get("artifacts", {})
+    artifact_bytes = state.get("artifact_bytes", {})
     
     for artifact_type, file_path in artifacts_paths.items():
         try:
-            if os.path.exists(file_path):
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    if file_path.endswith('.json'):
-                        artifact_contents[artifact_type] = json.load(f)
-                    else:
-                        artifact_contents[artifact_type] = f.read()
+            if artifact_type in artifact_bytes:
+                artifact_contents[artifact_type] = _decode_artifact(file_path, artifact_bytes[artifact_type])
+                continue
+            
+            try:
+                mtime_ns = os.stat(file_path).st_mtime_ns
+            except FileNotFoundError:
+                mtime_ns = None
+            
+            if mtime_ns is not None:
+                artifact_contents[artifact_type] = _read_artifact(file_path, mtime_ns)
             else:
                 # Fallback to state data if file doesn't exist
                 if artifact_type == "gherkin":
@@ -1237,18 +1546,23 @@ async def get_run_status(run_id: str):
 @app.get("/api/download/{run_id}/{artifact_type}")
 async def download_artifact(run_id: str, artifact_type: str):
     """Download a specific artifact file"""
-    from fastapi.responses import FileResponse
-    
-    if run_id not in active_runs:
+    state = await active_runs.load(run_id)
+    if state is None:
         return {"error": "Run not found"}
-    
-    state = active_runs[run_id]
     artifacts = state.get("artifacts", {})
     
     if artifact_type not in artifacts:
         return {"error": f"Artifact '{artifact_type}' not found"}
     
     file_path = artifacts[artifact_type]
+    artifact_bytes = state.get("artifact_bytes", {})
+    if artifact_type in artifact_bytes:
+        return Response(
+            content=artifact_bytes[artifact_type],
+            media_type='application/octet-stream',
+            headers={"Content-Disposition": f'attachment; filename="{os.path.basename(file_path)}"'}
+        )
+    
     if not os.path.exists(file_path):
         return {"error": f"Artifact file not found: {file_path}"}
     
@@ -1261,31 +1575,20 @@ async def download_artifact(run_id: str, artifact_type: str):
 @app.get("/api/download-all/{run_id}")
 async def download_all_artifacts(run_id: str):
     """Download all artifacts as a ZIP file"""
-    import zipfile
-    from fastapi.responses import FileResponse
-    from tempfile import NamedTemporaryFile
-    
-    if run_id not in active_runs:
+    state = await active_runs.load(run_id)
+    if state is None:
         return {"error": "Run not found"}
-    
-    state = active_runs[run_id]
     artifacts = state.get("artifacts", {})
     
     if not artifacts:
         return {"error": "No artifacts found"}
     
-    # Create a temporary ZIP file
-    with NamedTemporaryFile(delete=False, suffix='.zip') as temp_zip:
-        with zipfile.ZipFile(temp_zip.name, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for artifact_type, file_path in artifacts.items():
-                if os.path.exists(file_path):
-                    zipf.write(file_path, os.path.basename(file_path))
-        
-        return FileResponse(
-            path=temp_zip.name,
-            filename=f"artifacts_{run_id}.zip",
-            media_type='application/zip'
-        )
+    # Stream the archive as it is built; no temporary file on disk
+    return StreamingResponse(
+        _iter_zip(artifacts, state.get("artifact_bytes", {})),
+        media_type='application/zip',
+        headers={"Content-Disposition": f'attachment; filename="artifacts_{run_id}.zip"'}
+    )
 
 @app.post("/api/upload-files")
 async def upload_files(files: list[UploadFile] = File(...)):
@@ -1342,5 +1645,8 @@ if __name__ == "__main__":
         host="0.0.0.0", 
         port=8001,
         log_level="info",
-        reload=False
+        access_log=False,  # /api/run/{run_id} is polled; skip a log line per request
+        reload=False,
+        loop="uvloop" if UVLOOP_AVAILABLE else "asyncio",
+        http="httptools" if HTTPTOOLS_AVAILABLE else "h11"
     )
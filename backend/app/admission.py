@@ -0,0 +1,52 @@
+"""
+Admission control for concurrent uploads and runs.
+"""
+
+import asyncio
+
+
+class Admission:
+    """Caps concurrent work at a limit that can be changed at runtime."""
+    
+    def __init__(self, limit: int):
+        self.active = 0
+        self.limit = limit
+        self._cond = asyncio.Condition()
+    
+    async def acquire(self):
+        """Wait until a slot is free and take it."""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+    
+    async def release(self):
+        """Give a slot back and wake one waiter."""
+        async with self._cond:
+            self.active -= 1
+            self._cond.notify(1)
+    
+    def release_threadsafe(self, loop: asyncio.AbstractEventLoop):
+        """Give a slot back from a worker thread."""
+        asyncio.run_coroutine_threadsafe(self.release(), loop)
+    
+    async def resize(self, limit: int):
+        """
+        Change the limit; raising it admits waiters right away.
+        
+        Args:
+            limit: New maximum number of concurrent slots
+        """
+        async with self._cond:
+            self.limit = limit
+            self._cond.notify_all()
+    
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
+    
+    def snapshot(self) -> dict:
+        """Current usage and limit."""
+        return {"active": self.active, "limit": self.limit}
@@ -3,20 +3,53 @@ FastAPI application for the QA Analysis Platform.
 """
 
 import os
+import time
+import hashlib
+import importlib.util
 from typing import List, Optional
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks, Query
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Header, Request, Response, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, JSONResponse
-import json
+from fastapi.responses import StreamingResponse, ORJSONResponse
 import asyncio
+import orjson
 from datetime import datetime
 
 from .models import (
-    UploadedSource, FileNode, Run, RunSummary, StartRunRequest, StartRunResponse,
-    UploadByUrlRequest, GetFileContentRequest, ErrorResponse, SuccessResponse, generate_run_id
+    UploadedSource, FileNode, Run, RunSummary, StartRunRequest,
+    UploadByUrlRequest, AdmissionLimits, ErrorResponse, SuccessResponse, generate_run_id
 )
-from .storage import storage_manager
-from .runner import run_manager
+from .admission import Admission
+from .storage import StorageManager, storage_manager, get_storage
+from .runner import RunManager, run_manager, get_run_manager
+from .notebook24_adapter import notebook_adapter
+
+# Optional libuv-based event loop and C HTTP parser (both come with uvicorn[standard])
+UVLOOP_AVAILABLE = importlib.util.find_spec("uvloop") is not None
+HTTPTOOLS_AVAILABLE = importlib.util.find_spec("httptools") is not None
+
+# Largest accepted ZIP upload request, in bytes
+MAX_ZIP_BYTES = int(os.getenv("MAX_ZIP_BYTES", str(200 * 1024 * 1024)))
+
+# Concurrent ZIP uploads and analysis runs admitted before new ones wait;
+# both can be changed at runtime through /api/admin/admission
+upload_admission = Admission(int(os.getenv("MAX_CONCURRENT_UPLOADS", "4")))
+run_admission = Admission(int(os.getenv("MAX_CONCURRENT_RUNS", "8")))
+
+# Local file header / end-of-central-directory (empty archive) signatures
+ZIP_MAGIC = (b"PK\x03\x04", b"PK\x05\x06")
+
+def _etag(*parts) -> str:
+    """Strong ETag for a resource version."""
+    digest = hashlib.blake2b(":".join(map(str, parts)).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    """Whether the client's If-None-Match already names this ETag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return any(tag.strip() in (etag, "*") for tag in if_none_match.split(","))
 
 
 # Create FastAPI app
@@ -25,7 +58,8 @@ app = FastAPI(
     description="Backend API for the QA Analysis Platform",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -38,16 +72,35 @@ app.add_middleware(
 )
 
 
-# Health check endpoint
-@app.get("/health")
-async def health_check():
+# Seconds a /health body (and its timestamp) is reused before being rebuilt
+HEALTH_CLOCK_RESOLUTION = 0.1
+
+# (monotonic time built, encoded body) of the last /health response
+_health_body = (float("-inf"), b"")
+
+
+# Health check endpoint, registered as a plain Starlette route so probes skip
+# FastAPI's request validation and response serialization
+async def health_check(request: Request) -> Response:
     """Health check endpoint."""
-    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+    global _health_body
+    now = time.monotonic()
+    if now - _health_body[0] >= HEALTH_CLOCK_RESOLUTION:
+        # Probes within the resolution share one timestamp and encoded body
+        _health_body = (now, orjson.dumps({"status": "healthy", "timestamp": datetime.utcnow().isoformat()}))
+    return Response(_health_body[1], media_type="application/json")
+
+
+app.router.add_route("/health", health_check, methods=["GET"])
 
 
 # File upload endpoints
-@app.post("/api/upload-zip")
-async def upload_zip_file(file: UploadFile = File(...)):
+@app.post("/api/upload-zip", response_model=UploadedSource)
+async def upload_zip_file(
+    file: UploadFile = File(...),
+    content_length: Optional[int] = Header(None),
+    storage: StorageManager = Depends(get_storage)
+):
     """
     Upload a ZIP file and extract its contents using save_zip.
     
@@ -61,31 +114,52 @@ async def upload_zip_file(file: UploadFile = File(...)):
                 detail="Only ZIP files are allowed"
             )
         
-        # Read file content
-        content = await file.read()
+        # Reject oversized requests before touching the archive
+        if content_length and content_length > MAX_ZIP_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload exceeds the {MAX_ZIP_BYTES} byte limit"
+            )
         
-        if len(content) == 0:
+        # Check the size without reading the spooled upload into memory; this also
+        # covers chunked uploads and clients that send no Content-Length
+        file.file.seek(0, os.SEEK_END)
+        size = file.file.tell()
+        if size == 0:
             raise HTTPException(
                 status_code=400,
                 detail="Empty file uploaded"
             )
+        if size > MAX_ZIP_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload exceeds the {MAX_ZIP_BYTES} byte limit"
+            )
+        
+        # Only the signature is read to reject non-ZIP content early
+        file.file.seek(0)
+        if file.file.read(4) not in ZIP_MAGIC:
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid ZIP file"
+            )
         
-        # Use save_zip function
-        upload_id, file_tree = await storage_manager.save_zip(content, file.filename)
+        # Use save_zip function, extracting directly from the spooled upload
+        async with upload_admission:
+            upload_id, file_tree = await storage.save_zip(file.file, file.filename)
         
-        return {
-            "uploadId": upload_id,
-            "root": file_tree.model_dump()
-        }
+        return UploadedSource(uploadId=upload_id, root=file_tree)
         
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 
-@app.post("/api/upload-url")
-async def upload_from_url(request: UploadByUrlRequest):
+@app.post("/api/upload-url", response_model=UploadedSource)
+async def upload_from_url(request: UploadByUrlRequest, storage: StorageManager = Depends(get_storage)):
     """
     Upload source code from a URL using save_url.
     
@@ -100,50 +174,57 @@ async def upload_from_url(request: UploadByUrlRequest):
             )
         
         # Use save_url function
-        upload_id, file_tree = await storage_manager.save_url(request.url)
+        upload_id, file_tree = await storage.save_url(request.url)
         
-        return {
-            "uploadId": upload_id,
-            "root": file_tree.model_dump()
-        }
+        return UploadedSource(uploadId=upload_id, root=file_tree)
         
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"URL upload failed: {str(e)}")
 
 
 # File management endpoints
-@app.get("/api/files")
-async def list_files():
+@app.get("/api/files", response_model=FileNode)
+async def list_files(request: Request, storage: StorageManager = Depends(get_storage)):
     """
     Get the file tree of the latest upload.
     
-    Returns the FileNode structure of the most recent upload.
+    Returns the FileNode structure of the most recent upload, or 304 when the
+    client's If-None-Match matches the upload's ETag.
     """
     try:
         # Get the most recent upload directory
-        uploads_dir = storage_manager.uploads_dir
-        if not uploads_dir.exists():
+        if not storage.uploads_dir.exists():
             raise HTTPException(
                 status_code=404,
                 detail="No files uploaded yet"
             )
         
-        # Find the latest upload (by directory name which contains timestamp)
-        upload_dirs = [d for d in uploads_dir.iterdir() if d.is_dir()]
-        if not upload_dirs:
+        # Find the latest upload (cached after the first lookup or upload)
+        latest_upload = storage.get_latest_upload()
+        if latest_upload is None:
             raise HTTPException(
                 status_code=404,
                 detail="No uploads found"
             )
-        
-        # Sort by name (which contains timestamp) to get latest
-        latest_upload = sorted(upload_dirs, key=lambda x: x.name)[-1]
         latest_upload_id = latest_upload.name
         
-        # Build file tree for the latest upload
-        file_tree = storage_manager.build_tree(latest_upload, latest_upload_id)
+        # Uploads are immutable, so the id and directory mtime identify the tree;
+        # clients revalidate every time since the latest upload can change
+        mtime_ns = latest_upload.stat().st_mtime_ns
+        etag = _etag(latest_upload_id, mtime_ns)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if _not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        
+        # File tree of the latest upload, serialized straight to JSON without FileNode
+        # models; repeat requests for an unchanged upload are served from memory
+        content = await storage.tree_json(latest_upload, latest_upload_id, mtime_ns)
         
-        return file_tree.model_dump()
+        return Response(content=content, media_type="application/json", headers=headers)
         
     except HTTPException:
         raise
@@ -152,14 +233,27 @@ async def list_files():
 
 
 @app.get("/api/file")
-async def get_file_content(path: str = Query(..., description="File path to read")):
+async def get_file_content(
+    request: Request,
+    response: Response,
+    path: str = Query(..., description="File path to read"),
+    storage: StorageManager = Depends(get_storage)
+):
     """
     Get the content of a specific file.
     
-    Returns the file content as a string.
+    Returns the file content as a string, or 304 when the client's
+    If-None-Match matches the file's ETag.
     """
     try:
-        content = await storage_manager.read_file(path)
+        stat = await storage.stat_file(path)
+        etag = _etag(path, stat.st_mtime_ns, stat.st_size)
+        headers = {"ETag": etag, "Cache-Control": "private, max-age=5"}
+        if _not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+        
+        content = await storage.read_file(path)
         return {"content": content, "path": path}
         
     except FileNotFoundError:
@@ -172,7 +266,7 @@ async def get_file_content(path: str = Query(..., description="File path to read
 
 # QA Analysis endpoints
 @app.post("/api/run")
-async def start_analysis_run(request: StartRunRequest):
+async def start_analysis_run(request: StartRunRequest, runs: RunManager = Depends(get_run_manager)):
     """
     Start a new QA analysis run using start_run.
     
@@ -186,13 +280,22 @@ async def start_analysis_run(request: StartRunRequest):
                 detail="At least one file path must be provided"
             )
         
+        # Wait for a run slot; it is held until the run's background thread finishes
+        await run_admission.acquire()
+        loop = asyncio.get_running_loop()
+        
         # Generate run ID and start the run
         run_id = generate_run_id()
-        returned_run_id = run_manager.start_run(
-            run_id=run_id,
-            paths=request.paths,
-            use_notebook=request.use_notebook
-        )
+        try:
+            returned_run_id = runs.start_run(
+                run_id=run_id,
+                paths=request.paths,
+                use_notebook=request.use_notebook,
+                on_finish=lambda: run_admission.release_threadsafe(loop)
+            )
+        except Exception:
+            await run_admission.release()
+            raise
         
         return {"runId": returned_run_id}
         
@@ -200,27 +303,27 @@ async def start_analysis_run(request: StartRunRequest):
         raise HTTPException(status_code=500, detail=f"Failed to start run: {str(e)}")
 
 
-@app.get("/api/run/{run_id}")
-async def get_run_details(run_id: str):
+@app.get("/api/run/{run_id}", response_model=Run)
+async def get_run_details(run_id: str, runs: RunManager = Depends(get_run_manager)):
     """
     Get detailed information about a specific run.
     
     Returns complete run information including agents, coverage, files, and artifacts.
     """
     try:
-        run = await run_manager.get_run(run_id)
+        run = await runs.get_run(run_id)
         
         if not run:
             raise HTTPException(status_code=404, detail="Run not found")
         
-        return run.model_dump()
+        return run
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get run: {str(e)}")
 
 
 @app.get("/api/run/{run_id}/stream")
-async def stream_run_progress(run_id: str):
+async def stream_run_progress(run_id: str, runs: RunManager = Depends(get_run_manager)):
     """
     Stream real-time updates for a running analysis using event_stream.
     
@@ -228,7 +331,7 @@ async def stream_run_progress(run_id: str):
     """
     try:
         return StreamingResponse(
-            run_manager.event_stream(run_id),
+            runs.event_stream(run_id),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
@@ -236,6 +339,9 @@ async def stream_run_progress(run_id: str):
                 "Content-Type": "text/event-stream",
                 "Access-Control-Allow-Origin": "*",
                 "Access-Control-Allow-Headers": "*",
+                # Flush each event immediately: no proxy buffering, no compression middleware
+                "X-Accel-Buffering": "no",
+                "Content-Encoding": "identity",
             }
         )
     except Exception as e:
@@ -243,44 +349,30 @@ async def stream_run_progress(run_id: str):
 
 
 # Reporting endpoints
-@app.get("/api/reports")
-async def list_reports():
+@app.get("/api/reports", response_model=List[RunSummary])
+async def list_reports(runs: RunManager = Depends(get_run_manager)):
     """
     List last 20 analysis runs with summary information.
     
     Returns a list of run summaries sorted by creation date (newest first).
     """
     try:
-        runs = await run_manager.list_runs()
-        
-        # Limit to last 20 runs (already sorted by runId which contains timestamp)
-        recent_runs = runs[:20]
-        
-        # Convert to summaries
-        summaries = [
-            {
-                "runId": run.runId,
-                "status": run.status,
-                "coverage": run.coverage.model_dump() if run.coverage else None
-            }
-            for run in recent_runs
-        ]
-        
-        return summaries
+        # Last 20 runs, newest first (runId contains timestamp)
+        return await runs.list_run_summaries(20)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list reports: {str(e)}")
 
 
 @app.delete("/run/{run_id}")
-async def cancel_run(run_id: str):
+async def cancel_run(run_id: str, runs: RunManager = Depends(get_run_manager)):
     """
     Cancel a running analysis.
     
     Returns success status.
     """
     try:
-        success = await run_manager.cancel_run(run_id)
+        success = await runs.cancel_run(run_id)
         
         if not success:
             raise HTTPException(
@@ -296,11 +388,11 @@ async def cancel_run(run_id: str):
 
 # Utility endpoints
 @app.get("/status")
-async def get_system_status():
+async def get_system_status(runs: RunManager = Depends(get_run_manager)):
     """Get system status and statistics."""
     try:
-        active_runs = len([r for r in run_manager.active_runs.values()])
-        completed_runs = len([r for r in run_manager.completed_runs.values()])
+        active_runs = len(runs.active_runs)
+        completed_runs = len(runs.completed_runs)
         
         return {
             "status": "operational",
@@ -314,28 +406,43 @@ async def get_system_status():
         raise HTTPException(status_code=500, detail=f"Failed to get status: {str(e)}")
 
 
+@app.post("/api/admin/admission")
+async def update_admission_limits(limits: AdmissionLimits):
+    """
+    Change the concurrent upload/run limits at runtime.
+    
+    Returns the current usage and limits.
+    """
+    if limits.uploads is not None:
+        await upload_admission.resize(limits.uploads)
+    if limits.runs is not None:
+        await run_admission.resize(limits.runs)
+    
+    return {"uploads": upload_admission.snapshot(), "runs": run_admission.snapshot()}
+
+
 # Error handlers
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
     """Handle 404 errors."""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=404,
         content=ErrorResponse(
             error="Not Found",
             message="The requested resource was not found"
-        ).dict()
+        ).model_dump()
     )
 
 
 @app.exception_handler(500)
 async def internal_error_handler(request, exc):
     """Handle internal server errors."""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content=ErrorResponse(
             error="Internal Server Error",
             message="An unexpected error occurred"
-        ).dict()
+        ).model_dump()
     )
 
 
@@ -355,9 +462,15 @@ async def shutdown_event():
     """Clean up on shutdown."""
     print("🛑 QA Analysis Platform API shutting down...")
     
-    # Cancel any active runs
-    for run_id in list(run_manager.run_tasks.keys()):
-        await run_manager.cancel_run(run_id)
+    # Cancel any active runs concurrently
+    await asyncio.gather(
+        *(run_manager.cancel_run(run_id) for run_id in list(run_manager.run_tasks.keys())),
+        return_exceptions=True
+    )
+    run_manager.shutdown()
+    
+    storage_manager.close()
+    notebook_adapter.shutdown_kernel()
     
     print("✅ Shutdown complete")
 
@@ -371,5 +484,7 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
-        log_level="info"
+        log_level="info",
+        loop="uvloop" if UVLOOP_AVAILABLE else "asyncio",
+        http="httptools" if HTTPTOOLS_AVAILABLE else "h11"
     )
@@ -4,9 +4,9 @@ These models match the frontend TypeScript types exactly.
 """
 
 from typing import Dict, List, Optional, Union, Literal, Any
-from pydantic import BaseModel, Field
-from datetime import datetime
-import uuid
+from pydantic import BaseModel, ConfigDict, Field
+import secrets
+import time
 
 
 # AgentKey type matching frontend
@@ -19,6 +19,9 @@ AgentKey = Literal[
 
 class AgentState(BaseModel):
     """Represents the state of a single QA agent."""
+    # Not frozen: the runner updates state/message in place as events arrive
+    model_config = ConfigDict(extra="forbid")
+    
     key: AgentKey
     label: str
     state: Literal["idle", "running", "success", "warn", "error"]
@@ -37,6 +40,8 @@ class Coverage(BaseModel):
 
 class FileNode(BaseModel):
     """Represents a file or directory in the project structure."""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     name: str
     path: str
     isDir: bool
@@ -45,6 +50,8 @@ class FileNode(BaseModel):
 
 class FileStatus(BaseModel):
     """Status of a file in a test run - matches frontend files array item."""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     path: str
     status: Literal["passed", "warn", "error"]
 
@@ -119,6 +126,12 @@ class ErrorResponse(BaseModel):
     details: Optional[Dict] = None
 
 
+class AdmissionLimits(BaseModel):
+    """Request to change the concurrent upload/run limits."""
+    uploads: Optional[int] = Field(default=None, ge=1)
+    runs: Optional[int] = Field(default=None, ge=1)
+
+
 class SuccessResponse(BaseModel):
     """Standard success response."""
     message: str
@@ -128,13 +141,16 @@ class SuccessResponse(BaseModel):
 # Utility functions
 def generate_run_id() -> str:
     """Generate a unique run ID with timestamp."""
-    timestamp = int(datetime.utcnow().timestamp() * 1000)  # milliseconds
-    unique_id = str(uuid.uuid4())[:8]
-    return f"run-{unique_id}-{timestamp}"
+    # 8 random hex chars and the epoch time in milliseconds
+    return f"run-{secrets.token_hex(4)}-{time.time_ns() // 1_000_000}"
+
+
+def id_timestamp(identifier: str) -> int:
+    """Epoch milliseconds at the end of a run or upload ID; 0 for IDs without one."""
+    suffix = identifier.rpartition("-")[2]
+    return int(suffix) if suffix.isdigit() else 0
 
 
 def generate_upload_id() -> str:
     """Generate a unique upload ID."""
-    timestamp = int(datetime.utcnow().timestamp() * 1000)  # milliseconds
-    unique_id = str(uuid.uuid4())[:8]
-    return f"upload-{unique_id}-{timestamp}"
+    return f"upload-{secrets.token_hex(4)}-{time.time_ns() // 1_000_000}"
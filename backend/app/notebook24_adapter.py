@@ -4,208 +4,69 @@ This module handles the integration with the Notebook 24 system for QA analysis.
 """
 
 import asyncio
-import json
+import atexit
+import copy
+import hashlib
+import importlib.util
+import logging
 import os
+import shutil
 import subprocess
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import cycle
 from pathlib import Path
 from typing import Dict, List, Optional, Any, AsyncGenerator, Generator
 from datetime import datetime
 import time
 
+import nbformat
+import orjson
+from jupyter_client import AsyncKernelManager
+from nbclient import NotebookClient
+from pydantic import TypeAdapter
+
 from .models import AgentState, Coverage, FileStatus, AGENTS
+from .storage import storage_manager
 
+logger = logging.getLogger(__name__)
 
-class Notebook24Adapter:
-    """Adapter for integrating with Notebook 24 analysis system."""
-    
-    def __init__(self):
-        self.notebook_path = os.getenv("NOTEBOOK24_PATH", "/opt/notebook24")
-        self.python_env = os.getenv("NOTEBOOK24_PYTHON", "python3")
-    
-    def run_agents(self, paths: List[str], run_id: str, use_notebook: int = 24) -> Generator[Dict[str, Any], None, None]:
-        """
-        Mock implementation of agent execution for QA analysis.
-        
-        Args:
-            paths: List of file paths to analyze
-            run_id: The run ID for saving artifacts
-            
-        Yields:
-            Dict events with agent progress and results
-            
-        TODO: Wire this to actual Notebook24.ipynb execution
-        TODO: Replace mock data with real analysis results from notebook
-        TODO: Integrate with actual Jupyter kernel for notebook execution
-        TODO: Add proper error handling for notebook execution failures
-        TODO: Implement real coverage collection from test execution
-        TODO: Add configurable agent selection and ordering
-        TODO: Support for custom analysis parameters from notebook
-        TODO: Add progress tracking and cancellation support
-        """
-        from .storage import storage_manager
-        
-        # Create artifacts directory for this run
-        run_path = storage_manager.get_run_path(run_id)
-        artifacts_path = run_path / "artifacts"
-        artifacts_path.mkdir(parents=True, exist_ok=True)
-        
-        print(f"🚀 Starting QA analysis for {len(paths)} files...")
+# Optional in-process notebook executor with far less per-cell overhead than a kernel
+EXECNB_AVAILABLE = importlib.util.find_spec("execnb") is not None
 
-        # Optionally execute Notebook 24 and save executed notebook as an artifact
-        if use_notebook == 24:
-            yield {
-                "agent": "notebook",
-                "state": "running",
-                "message": "Executing notebook_24.ipynb..."
-            }
-            try:
-                executed_path = self._execute_notebook_24(run_id)
-                # Also write a small summary artifact for visibility in artifacts list
-                from .storage import storage_manager
-                artifacts_summary = (
-                    f"# Notebook 24 Execution\n\n"
-                    f"Executed notebook saved at: `{executed_path}`\n\n"
-                    f"This file summarizes the execution of `notebook_24.ipynb`."
-                )
-                run_path = storage_manager.get_run_path(run_id)
-                summary_file = (run_path / "artifacts" / "notebook.md")
-                with open(summary_file, 'w', encoding='utf-8') as f:
-                    f.write(artifacts_summary)
-                yield {
-                    "agent": "notebook",
-                    "state": "success",
-                    "message": "Notebook 24 executed",
-                    "artifact": f"Executed notebook saved to {executed_path}",
-                }
-            except Exception as e:
-                yield {
-                    "agent": "notebook",
-                    "state": "warn",
-                    "message": f"Notebook 24 execution skipped: {str(e)}",
-                }
-        
-        # Iterate through 8 agents from AGENTS constant
-        for agent_info in AGENTS:
-            agent_key = agent_info["key"]
-            agent_label = agent_info["label"]
-            
-            # Yield running state
-            yield {
-                "agent": agent_key,
-                "state": "running",
-                "message": f"Running {agent_label}...",
-                "progress": f"Analyzing {len(paths)} files"
-            }
-            
-            # Brief sleep to simulate processing
-            time.sleep(0.5)  # 500ms sleep for realistic timing
-            
-            # Generate mock artifact content based on agent type
-            artifact_content = self._generate_mock_artifact(agent_key, agent_label, paths)
-            
-            # Save artifact to file
-            artifact_file = artifacts_path / f"{agent_key}.md"
-            with open(artifact_file, 'w', encoding='utf-8') as f:
-                f.write(artifact_content)
-            
-            # Yield success state with artifact
-            yield {
-                "agent": agent_key,
-                "state": "success", 
-                "message": f"{agent_label} completed successfully",
-                "artifact": artifact_content,
-                "artifact_file": str(artifact_file)
-            }
-        
-        # Generate and yield fake coverage summary
-        fake_coverage = {
-            "overall_percentage": 87.5,
-            "statements_percentage": 89.2,
-            "functions_percentage": 85.7,
-            "branches_percentage": 84.3,
-            "coverage_collected": True,
-            "source": "simulated"  # Use 'simulated' to indicate mock data
-        }
-        
-        # Save coverage data as artifact
-        coverage_file = artifacts_path / "coverage_summary.json"
-        with open(coverage_file, 'w', encoding='utf-8') as f:
-            json.dump(fake_coverage, f, indent=2)
-        
-        # Final yield with coverage and completion
-        yield {
-            "agent": "final",
-            "state": "completed",
-            "message": "All agents completed successfully",
-            "coverage": fake_coverage,
-            "summary": {
-                "total_agents": len(AGENTS),
-                "files_analyzed": len(paths),
-                "artifacts_generated": len(AGENTS) + 1,  # +1 for coverage
-                "artifacts_path": str(artifacts_path)
-            }
-        }
-        
-        print(f"✅ QA analysis completed for run {run_id}")
 
-    def _execute_notebook_24(self, run_id: str) -> str:
-        """
-        Execute the notebook_24.ipynb located in the repository's notebook folder
-        and save the executed notebook under the run's artifacts directory.
-        """
-        from .storage import storage_manager
-        import nbformat
-        from nbclient import NotebookClient
-        from pathlib import Path
+# Statuses for _generate_file_statuses, indexed by file position modulo 10
+_FILE_STATUS_CYCLE = ("error", "passed", "passed", "passed", "passed", "warn", "passed", "passed", "passed", "passed")
+_FILE_STATUS_LIST = TypeAdapter(List[FileStatus])
 
-        # Resolve project root and notebook path
-        project_root = Path(__file__).resolve().parents[2]
-        # Prefer the ALL Agent notebook if present; fallback to notebook_24.ipynb
-        all_agents_path = project_root / "notebook" / "ALL Agent.ipynb"
-        notebook24_path = project_root / "notebook" / "notebook_24.ipynb"
-        notebook_path = all_agents_path if all_agents_path.exists() else notebook24_path
-        if not notebook_path.exists():
-            raise FileNotFoundError(f"Notebook not found at {notebook_path}")
+# Coverage reported by the mock agents; 'simulated' marks it as mock data
+_SIMULATED_COVERAGE = {
+    "overall_percentage": 87.5,
+    "statements_percentage": 89.2,
+    "functions_percentage": 85.7,
+    "branches_percentage": 84.3,
+    "coverage_collected": True,
+    "source": "simulated"
+}
 
-        # Prepare output path
-        run_path = storage_manager.get_run_path(run_id)
-        artifacts_path = run_path / "artifacts"
-        artifacts_path.mkdir(parents=True, exist_ok=True)
-        executed_name = "ALL Agent.executed.ipynb" if notebook_path.name.startswith("ALL Agent") else "notebook_24.executed.ipynb"
-        executed_path = artifacts_path / executed_name
+# Archive holding the artifacts of a run inside its artifacts directory
+ARTIFACT_ARCHIVE_NAME = "artifacts.zip"
 
-        # Load and execute the notebook
-        nb = nbformat.read(notebook_path, as_version=4)
-        client = NotebookClient(nb, timeout=120, kernel_name="python3", allow_errors=True)
-        client.execute()
-
-        # Save executed notebook
-        nbformat.write(nb, executed_path)
-        return str(executed_path)
-    
-    def _generate_mock_artifact(self, agent_key: str, agent_label: str, paths: List[str]) -> str:
-        """
-        Generate mock artifact content for each agent.
-        
-        TODO: Replace with actual notebook cell execution results
-        TODO: Add configurable artifact templates
-        TODO: Integrate with real analysis data from notebook
-        """
-        timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
-        
-        if agent_key == "code_analysis":
-            return f"""# {agent_label} Report
+# Mock artifact templates per agent, filled in with str.format
+_MOCK_ARTIFACT_TEMPLATES: Dict[str, str] = {
+    "code_analysis": """# {agent_label} Report
 Generated: {timestamp}
 
 ## Overview
-Analyzed {len(paths)} files in the project.
+Analyzed {file_count} files in the project.
 
 ## File Summary
-{chr(10).join(f"- `{path}`: Source file detected" for path in paths[:10])}
-{"..." if len(paths) > 10 else ""}
+{file_list}
+{more_files}
 
 ## Code Metrics
-- Total files analyzed: {len(paths)}
+- Total files analyzed: {file_count}
 - Estimated complexity: Medium
 - Test coverage potential: High
 - Framework detected: React/TypeScript
@@ -217,10 +78,9 @@ Analyzed {len(paths)} files in the project.
 - Modern development practices followed
 
 TODO: Replace with actual static analysis results from notebook
-"""
+""",
 
-        elif agent_key == "user_story":
-            return f"""# {agent_label} Report
+    "user_story": """# {agent_label} Report
 Generated: {timestamp}
 
 ## Generated User Stories
@@ -237,10 +97,9 @@ Generated: {timestamp}
 - Testable: All stories include clear test conditions
 
 TODO: Generate stories from actual code analysis results
-"""
+""",
 
-        elif agent_key == "gherkin":
-            return f"""# {agent_label} Report
+    "gherkin": """# {agent_label} Report
 Generated: {timestamp}
 
 ## Gherkin Scenarios
@@ -270,10 +129,9 @@ Feature: Code Quality Analysis
 - Test cases: 24 derived from scenarios
 
 TODO: Generate scenarios from actual user story analysis
-"""
+""",
 
-        elif agent_key == "test_plan":
-            return f"""# {agent_label} Report
+    "test_plan": """# {agent_label} Report
 Generated: {timestamp}
 
 ## Test Strategy
@@ -294,10 +152,9 @@ Generated: {timestamp}
 - E2E Tests: Critical paths covered
 
 TODO: Generate detailed test plan from scenario analysis
-"""
+""",
 
-        elif agent_key == "playwright":
-            return f"""# {agent_label} Report
+    "playwright": """# {agent_label} Report
 Generated: {timestamp}
 
 ## Generated Playwright Tests
@@ -323,10 +180,9 @@ test.describe('File Upload Flow', () => {{
 - Coverage: Upload, Analysis, Reporting flows
 
 TODO: Generate tests from actual test plan and scenarios
-"""
+""",
 
-        elif agent_key == "execution":
-            return f"""# {agent_label} Report
+    "execution": """# {agent_label} Report
 Generated: {timestamp}
 
 ## Test Execution Results
@@ -347,10 +203,9 @@ Generated: {timestamp}
 - `upload-large-files.spec.ts`: Timeout waiting for upload completion
 
 TODO: Execute actual generated tests and collect real results
-"""
+""",
 
-        elif agent_key == "coverage":
-            return f"""# {agent_label} Report
+    "coverage": """# {agent_label} Report
 Generated: {timestamp}
 
 ## Coverage Analysis
@@ -362,7 +217,7 @@ Generated: {timestamp}
 - **Lines**: 87.5% (2,108/2,409)
 
 ### File Coverage
-{chr(10).join(f"- `{path}`: 85-95% coverage" for path in paths[:5])}
+{coverage_list}
 
 ### Uncovered Areas
 - Error handling paths (12.5%)
@@ -370,14 +225,13 @@ Generated: {timestamp}
 - Complex branching logic (15.7%)
 
 TODO: Collect actual coverage data from test execution
-"""
+""",
 
-        elif agent_key == "final_report":
-            return f"""# {agent_label} Report
+    "final_report": """# {agent_label} Report
 Generated: {timestamp}
 
 ## Executive Summary
-QA Analysis completed successfully for {len(paths)} files.
+QA Analysis completed successfully for {file_count} files.
 **Overall Quality Score: A- (87.5%)**
 
 ## Key Achievements
@@ -399,514 +253,512 @@ QA Analysis completed successfully for {len(paths)} files.
 - Actionable recommendations
 
 TODO: Compile actual analysis results into comprehensive report
-"""
+""",
+}
 
-        else:
-            return f"""# {agent_label} Report
+_DEFAULT_MOCK_ARTIFACT_TEMPLATE = """# {agent_label} Report
 Generated: {timestamp}
 
 ## Analysis Complete
-{agent_label} processing completed for {len(paths)} files.
+{agent_label} processing completed for {file_count} files.
 
 TODO: Implement specific analysis logic for {agent_key}
 """
+
+
+class Notebook24Adapter:
+    """Adapter for integrating with Notebook 24 analysis system."""
     
-    async def analyze_code(
-        self, 
-        source_path: Path, 
-        selected_paths: List[str],
-        use_notebook: int = 24,
-        custom_tests: Optional[str] = None
-    ) -> AsyncGenerator[Dict[str, Any], None]:
+    def __init__(self):
+        self.notebook_path = os.getenv("NOTEBOOK24_PATH", "/opt/notebook24")
+        self.python_env = os.getenv("NOTEBOOK24_PYTHON", "python3")
+        # Seconds each mock agent pretends to work; 0 skips the wait entirely
+        self.simulate_delay = float(os.getenv("NOTEBOOK24_SIMULATE_DELAY", "0"))
+        # "execnb" runs the notebook in-process; anything else uses nbclient and a kernel
+        self.executor = os.getenv("NOTEBOOK24_EXECUTOR", "nbclient")
+        if self.executor == "execnb" and not EXECNB_AVAILABLE:
+            logger.warning("execnb not installed, falling back to nbclient")
+            self.executor = "nbclient"
+        # Per-cell and whole-notebook execution budgets in seconds
+        self.cell_timeout = int(os.getenv("NOTEBOOK24_CELL_TIMEOUT", "30"))
+        self.total_timeout = float(os.getenv("NOTEBOOK24_TOTAL_TIMEOUT", "300"))
+        self._shell = None
+        self._shell_lock = threading.Lock()
+        self._resolved_notebook_path: Optional[Path] = None
+        # Parsed notebooks keyed by (path, executor) -> (mtime_ns, notebook)
+        self._notebook_cache: Dict[tuple, tuple] = {}
+        # (content digest, path) of the last executed notebook written to disk
+        self._last_executed: Optional[tuple] = None
+        # Kernel shared across notebook runs, driven from its own event loop thread;
+        # its user namespace is reset before each run
+        self._km = None
+        self._kc = None
+        self._kernel_lock = asyncio.Lock()
+        self._kernel_loop = asyncio.new_event_loop()
+        threading.Thread(target=self._kernel_loop.run_forever, name="notebook24-kernel", daemon=True).start()
+        # Collect a run's artifacts into one archive unless individual files are requested
+        self.artifact_archive = os.getenv("NOTEBOOK24_ARTIFACT_FILES", "0") != "1"
+        # Artifact files are written here so the event stream never waits on disk
+        self._io_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="notebook24-io")
+        atexit.register(self.shutdown_kernel)
+        
+        # Start the kernel in the background so the first run does not wait for it
+        if self.executor == "nbclient" and os.getenv("NOTEBOOK24_PREWARM", "1") == "1":
+            asyncio.run_coroutine_threadsafe(self._prewarm_kernel(), self._kernel_loop)
+    
+    def run_agents(self, paths: List[str], run_id: str, use_notebook: int = 24) -> Generator[Dict[str, Any], None, None]:
         """
-        Run QA analysis on the provided source code.
+        Mock implementation of agent execution for QA analysis.
         
         Args:
-            source_path: Path to the source code directory
-            selected_paths: List of specific paths to analyze
-            use_notebook: Notebook version (18 or 24)
-            custom_tests: Custom test specifications
+            paths: List of file paths to analyze
+            run_id: The run ID for saving artifacts
             
         Yields:
-            Analysis progress updates
+            Dict events with agent progress and results
+            
+        TODO: Wire this to actual Notebook24.ipynb execution
+        TODO: Replace mock data with real analysis results from notebook
+        TODO: Integrate with actual Jupyter kernel for notebook execution
+        TODO: Add proper error handling for notebook execution failures
+        TODO: Implement real coverage collection from test execution
+        TODO: Add configurable agent selection and ordering
+        TODO: Support for custom analysis parameters from notebook
+        TODO: Add progress tracking and cancellation support
         """
-        # Simulate the 8-step analysis process
-        agents = [
-            ("code_analysis", "Code Analysis", self._analyze_code_structure),
-            ("user_story", "User Story Generation", self._generate_user_stories),
-            ("gherkin", "Gherkin Scenarios", self._generate_gherkin),
-            ("test_plan", "Test Plan Creation", self._create_test_plan),
-            ("playwright", "Playwright Test Generation", self._generate_playwright_tests),
-            ("execution", "Test Execution", self._execute_tests),
-            ("coverage", "Coverage Analysis", self._analyze_coverage),
-            ("final_report", "Final Report", self._generate_final_report),
-        ]
-        
-        analysis_results = {}
+        # Create artifacts directory for this run
+        run_path = storage_manager.get_run_path(run_id)
+        artifacts_path = run_path / "artifacts"
+        artifacts_path.mkdir(parents=True, exist_ok=True)
         
-        for agent_key, agent_label, analysis_func in agents:
-            # Update agent state to running
+        logger.info("Starting QA analysis for %d files (run %s)", len(paths), run_id)
+        pending_writes = []
+        archive: Optional[Dict[str, bytes]] = {} if self.artifact_archive else None
+        timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
+
+        # Optionally execute Notebook 24 and save executed notebook as an artifact
+        if use_notebook == 24:
             yield {
-                "agents": [{
-                    "key": agent_key,
-                    "label": agent_label,
-                    "state": "running",
-                    "message": f"Running {agent_label.lower()}..."
-                }]
+                "agent": "notebook",
+                "state": "running",
+                "message": "Executing notebook_24.ipynb..."
             }
-            
             try:
-                # Simulate processing time
-                await asyncio.sleep(2)
-                
-                # Run the analysis step
-                result = await analysis_func(source_path, selected_paths, custom_tests)
-                analysis_results[agent_key] = result
-                
-                # Update agent state to success
+                started = time.perf_counter()
+                executed_path = self._execute_notebook_24(run_id, artifacts_path)
+                duration = round(time.perf_counter() - started, 2)
+                # Also write a small summary artifact for visibility in artifacts list
+                artifacts_summary = (
+                    f"# Notebook 24 Execution\n\n"
+                    f"Executed notebook saved at: `{executed_path}`\n\n"
+                    f"This file summarizes the execution of `notebook_24.ipynb`."
+                )
+                summary_data = artifacts_summary.encode("utf-8")
+                summary_ref = self._queue_artifact(
+                    artifacts_path, "notebook.md", summary_data, pending_writes, archive
+                )
+                # The artifact is the summary itself, so the file it references holds the same text
                 yield {
-                    "agents": [{
-                        "key": agent_key,
-                        "label": agent_label,
-                        "state": "success",
-                        "message": f"{agent_label} completed successfully"
-                    }],
-                    "artifacts": {agent_key: result} if isinstance(result, (str, dict)) else {}
+                    "agent": "notebook",
+                    "state": "success",
+                    "message": f"Notebook 24 executed in {duration}s",
+                    "artifact": artifacts_summary,
+                    **summary_ref,
+                    "artifact_bytes": len(summary_data),
+                    "duration": duration,
                 }
-                
             except Exception as e:
-                # Update agent state to error
                 yield {
-                    "agents": [{
-                        "key": agent_key,
-                        "label": agent_label,
-                        "state": "error",
-                        "message": f"Error in {agent_label.lower()}: {str(e)}"
-                    }],
-                    "errors": [f"{agent_label}: {str(e)}"]
+                    "agent": "notebook",
+                    "state": "warn",
+                    "message": f"Notebook 24 execution skipped: {str(e)}",
                 }
-                # Continue with next agent even if one fails
         
-        # Generate final results
-        final_coverage = self._generate_coverage_data()
-        file_statuses = self._generate_file_statuses(selected_paths)
+        # Run the 8 agents from AGENTS concurrently; they are independent of each other
+        for agent_info in AGENTS:
+            yield {
+                "agent": agent_info["key"],
+                "state": "running",
+                "message": f"Running {agent_info['label']}...",
+                "progress": f"Analyzing {len(paths)} files"
+            }
+        
+        with ThreadPoolExecutor(max_workers=len(AGENTS)) as executor:
+            futures = [
+                executor.submit(self._run_single_agent, agent_info, paths, timestamp)
+                for agent_info in AGENTS
+            ]
+            
+            # Yield success state with artifact as each agent finishes
+            for future in as_completed(futures):
+                agent_info, artifact_content = future.result()
+                artifact_data = artifact_content.encode("utf-8")
+                artifact_ref = self._queue_artifact(
+                    artifacts_path, f"{agent_info['key']}.md", artifact_data, pending_writes, archive
+                )
+                yield {
+                    "agent": agent_info["key"],
+                    "state": "success", 
+                    "message": f"{agent_info['label']} completed successfully",
+                    "artifact": artifact_content,
+                    **artifact_ref,
+                    "artifact_bytes": len(artifact_data)
+                }
+        
+        # Generate and yield fake coverage summary
+        fake_coverage = dict(_SIMULATED_COVERAGE)
+        
+        # Save coverage data as artifact
+        self._queue_artifact(
+            artifacts_path, "coverage_summary.json", orjson.dumps(fake_coverage, option=orjson.OPT_INDENT_2), pending_writes, archive
+        )
+        if archive:
+            pending_writes.append(self._io_pool.submit(self._write_archive, artifacts_path / ARTIFACT_ARCHIVE_NAME, archive))
         
+        # Make sure every artifact is on disk before reporting completion
+        for write in pending_writes:
+            write.result()
+        
+        # Final yield with coverage and completion
         yield {
-            "status": "completed",
-            "coverage": final_coverage,
-            "files": file_statuses,
-            "artifacts": analysis_results
+            "agent": "final",
+            "state": "completed",
+            "message": "All agents completed successfully",
+            "coverage": fake_coverage,
+            "summary": {
+                "total_agents": len(AGENTS),
+                "files_analyzed": len(paths),
+                "artifacts_generated": len(AGENTS) + 1,  # +1 for coverage
+                "artifacts_path": str(artifacts_path)
+            }
         }
-    
-    async def _analyze_code_structure(
-        self, 
-        source_path: Path, 
-        selected_paths: List[str], 
-        custom_tests: Optional[str]
-    ) -> str:
-        """Analyze code structure and complexity."""
-        # Simulate code analysis
-        analysis = f"""# Code Analysis Report
-
-## Overview
-Analyzed {len(selected_paths)} files in the project.
-
-## File Summary
-"""
-        for path in selected_paths[:5]:  # Show first 5 files
-            analysis += f"- `{path}`: Source file detected\n"
-        
-        if len(selected_paths) > 5:
-            analysis += f"- ... and {len(selected_paths) - 5} more files\n"
         
-        analysis += f"""
-## Code Metrics
-- Total files analyzed: {len(selected_paths)}
-- Estimated complexity: Medium
-- Test coverage potential: High
-- Notebook version: 24
+        logger.info("QA analysis completed for run %s", run_id)
 
-## Recommendations
-- Focus on core business logic for testing
-- Consider edge cases for user input validation
-- Implement comprehensive error handling tests
-"""
+    def _queue_artifact(self, artifacts_path: Path, name: str, data: bytes, pending_writes: list, archive: Optional[Dict[str, bytes]]) -> Dict[str, Any]:
+        """
+        Queue one artifact for saving and return the event fields that locate it.
         
-        return analysis
+        With an archive the bytes are kept until the run ends and written as a
+        single member of artifacts.zip; otherwise the file is written in the background.
+        """
+        if archive is not None:
+            archive[name] = data
+            return {
+                "artifact_file": str(artifacts_path / ARTIFACT_ARCHIVE_NAME),
+                "artifact_member": name,
+            }
+        
+        artifact_file = artifacts_path / name
+        pending_writes.append(self._io_pool.submit(artifact_file.write_bytes, data))
+        return {"artifact_file": str(artifact_file)}
     
-    async def _generate_user_stories(
-        self, 
-        source_path: Path, 
-        selected_paths: List[str], 
-        custom_tests: Optional[str]
-    ) -> str:
-        """Generate user stories from code analysis."""
-        user_stories = """# User Stories
-
-Based on the code analysis, here are the key user stories:
-
-## Core Functionality
-1. **As a user**, I want to upload files so that I can analyze my code
-2. **As a developer**, I want to see test results so that I can improve code quality
-3. **As a QA engineer**, I want to generate test cases so that I can ensure comprehensive coverage
-
-## File Management
-4. **As a user**, I want to select specific files so that I can focus analysis on relevant code
-5. **As a user**, I want to preview file contents so that I can verify the correct files are selected
-
-## Reporting
-6. **As a stakeholder**, I want to view coverage reports so that I can understand test completeness
-7. **As a developer**, I want to download reports so that I can share results with the team
-"""
+    def _write_archive(self, archive_path: Path, archive: Dict[str, bytes]):
+        """Write every queued artifact of a run into one uncompressed ZIP."""
+        with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_STORED) as zf:
+            for name, data in archive.items():
+                zf.writestr(name, data)
+    
+    def _run_single_agent(self, agent_info: Dict[str, str], paths: List[str], timestamp: str):
+        """Run one mock agent and return its artifact; safe to call from a worker thread."""
+        agent_key = agent_info["key"]
         
-        if custom_tests:
-            user_stories += f"""
-## Custom Requirements
-Based on your custom test specifications:
-{custom_tests[:200]}...
-
-Additional user stories will be generated based on these requirements.
-"""
+        # Optional sleep to simulate processing
+        if self.simulate_delay:
+            time.sleep(self.simulate_delay)
         
-        return user_stories
-    
-    async def _generate_gherkin(
-        self, 
-        source_path: Path, 
-        selected_paths: List[str], 
-        custom_tests: Optional[str]
-    ) -> str:
-        """Generate Gherkin test scenarios."""
-        gherkin = """# Gherkin Test Scenarios
-
-## Feature: File Upload and Analysis
-
-```gherkin
-Feature: Code Analysis Platform
-  As a user
-  I want to upload and analyze my code
-  So that I can improve code quality
-
-  Scenario: Upload ZIP file
-    Given I am on the files page
-    When I upload a valid ZIP file
-    Then the files should be extracted and displayed
-    And I should see a success message
+        # Generate mock artifact content based on agent type
+        artifact_content = self._generate_mock_artifact(agent_key, agent_info["label"], paths, timestamp)
+        
+        return agent_info, artifact_content
 
-  Scenario: Select files for analysis
-    Given I have uploaded source code
-    When I select specific files from the tree
-    Then the files should be marked as selected
-    And the selected count should update
+    def _execute_notebook_24(self, run_id: str, artifacts_path: Path) -> str:
+        """
+        Execute the notebook_24.ipynb located in the repository's notebook folder
+        and save the executed notebook under the run's artifacts directory.
+        """
+        notebook_path = self._resolve_notebook_path()
 
-  Scenario: Start QA analysis
-    Given I have selected files for analysis
-    When I click the "Start Analysis" button
-    Then a new run should be created
-    And I should see the progress of all agents
-```
+        # Prepare output path (run_agents has already created artifacts_path)
+        executed_name = "ALL Agent.executed.ipynb" if notebook_path.name.startswith("ALL Agent") else "notebook_24.executed.ipynb"
+        executed_path = artifacts_path / executed_name
 
-## Feature: Test Execution and Reporting
+        if self.executor == "execnb":
+            from execnb.shell import read_nb, write_nb
+            
+            # execnb needs its own notebook structure (cells carry their index)
+            nb = self._load_notebook(notebook_path, read_nb)
+            with self._shell_lock:
+                shell = self._get_shell()
+                # Start each run from an empty user namespace. Not aggressive: the shell lives
+                # in this process, and culling sys.modules would unload the server's own imports
+                shell.reset(new_session=True)
+                shell.run_all(nb)
+            self._save_executed(nb, executed_path, write_nb)
+            return str(executed_path)
+
+        # Load the notebook and execute it asynchronously on the kernel loop
+        nb = self._load_notebook(notebook_path, lambda path: nbformat.read(path, as_version=4))
+        asyncio.run_coroutine_threadsafe(self._aexecute_notebook(nb), self._kernel_loop).result()
 
-```gherkin
-Feature: Test Results and Coverage
-  As a developer
-  I want to see test results and coverage
-  So that I can understand code quality
-
-  Scenario: View test coverage
-    Given a test run has completed
-    When I view the run details
-    Then I should see coverage percentages
-    And coverage should be broken down by type
-
-  Scenario: Download test report
-    Given a test run has completed successfully
-    When I click the download report button
-    Then a comprehensive report should be generated
-    And the report should be downloaded
-```
-"""
-        
-        return gherkin
+        # Save executed notebook
+        self._save_executed(nb, executed_path, nbformat.write)
+        return str(executed_path)
     
-    async def _create_test_plan(
-        self, 
-        source_path: Path, 
-        selected_paths: List[str], 
-        custom_tests: Optional[str]
-    ) -> str:
-        """Create a comprehensive test plan."""
-        test_plan = """# Comprehensive Test Plan
-
-## Test Strategy
-- **Unit Tests**: Test individual functions and methods
-- **Integration Tests**: Test component interactions
-- **End-to-End Tests**: Test complete user workflows
-- **Performance Tests**: Test system performance under load
-
-## Test Categories
-
-### 1. Functional Tests
-- File upload functionality
-- File tree navigation
-- Code analysis execution
-- Report generation
-
-### 2. UI/UX Tests
-- Responsive design validation
-- Accessibility compliance
-- User interaction flows
-- Error message display
-
-### 3. API Tests
-- Endpoint validation
-- Error handling
-- Request/response validation
-- Authentication/authorization
-
-### 4. Security Tests
-- Input validation
-- File upload security
-- Path traversal prevention
-- XSS and injection prevention
-
-## Test Environment
-- **Browser Support**: Chrome, Firefox, Safari, Edge
-- **Mobile Support**: iOS Safari, Android Chrome
-- **Network Conditions**: Slow 3G, Fast 3G, WiFi
-"""
+    def _resolve_notebook_path(self) -> Path:
+        """Find the notebook to execute; the result is reused by later runs."""
+        if self._resolved_notebook_path is not None and not os.getenv("NOTEBOOK24_FORCE_REDISCOVER"):
+            return self._resolved_notebook_path
         
-        if custom_tests:
-            test_plan += f"""
-## Custom Test Requirements
-{custom_tests}
-
-These requirements will be integrated into the test plan execution.
-"""
+        # Resolve project root and notebook path
+        project_root = Path(__file__).resolve().parents[2]
+        # Prefer the ALL Agent notebook if present; fallback to notebook_24.ipynb
+        all_agents_path = project_root / "notebook" / "ALL Agent.ipynb"
+        notebook24_path = project_root / "notebook" / "notebook_24.ipynb"
+        notebook_path = all_agents_path if all_agents_path.exists() else notebook24_path
+        if not notebook_path.exists():
+            raise FileNotFoundError(f"Notebook not found at {notebook_path}")
         
-        return test_plan
-    
-    async def _generate_playwright_tests(
-        self, 
-        source_path: Path, 
-        selected_paths: List[str], 
-        custom_tests: Optional[str]
-    ) -> str:
-        """Generate Playwright test code."""
-        playwright_tests = """// Playwright Test Suite
-// Generated tests for the QA Analysis Platform
-
-import { test, expect } from '@playwright/test';
-
-test.describe('File Upload and Management', () => {
-  test('should upload and display files', async ({ page }) => {
-    await page.goto('/files');
-    
-    // Upload a file
-    const fileInput = page.locator('input[type="file"]');
-    await fileInput.setInputFiles('test-files/sample.zip');
+        self._resolved_notebook_path = notebook_path
+        return notebook_path
     
-    // Verify upload success
-    await expect(page.locator('text=Upload successful')).toBeVisible();
-    await expect(page.locator('[data-testid="file-tree"]')).toBeVisible();
-  });
-
-  test('should select files for analysis', async ({ page }) => {
-    await page.goto('/files');
+    def _load_notebook(self, notebook_path: Path, reader):
+        """Return a fresh copy of the notebook, re-reading the file only when it changes."""
+        mtime = notebook_path.stat().st_mtime_ns
+        key = (notebook_path, self.executor)
+        cached = self._notebook_cache.get(key)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, reader(notebook_path))
+            self._notebook_cache[key] = cached
+        # Execution fills in outputs, so every run gets its own copy
+        return copy.deepcopy(cached[1])
     
-    // Select files
-    await page.locator('[data-testid="file-checkbox"]').first().click();
+    def _save_executed(self, nb, executed_path: Path, writer):
+        """
+        Save the executed notebook, linking to the previous run's copy when
+        the cells and their outputs are unchanged.
+        """
+        digest = hashlib.blake2b(
+            orjson.dumps([(cell.get("source"), cell.get("outputs")) for cell in nb.cells]),
+            digest_size=16
+        ).digest()
+        
+        if self._last_executed is not None:
+            last_digest, last_path = self._last_executed
+            if last_digest == digest and last_path != executed_path and last_path.exists():
+                # Per-cell timing metadata is taken from the earlier run
+                try:
+                    os.link(last_path, executed_path)
+                except OSError:
+                    shutil.copyfile(last_path, executed_path)
+                return
+        
+        writer(nb, executed_path)
+        self._last_executed = (digest, executed_path)
     
-    // Verify selection
-    await expect(page.locator('text=1 selected')).toBeVisible();
-  });
-});
-
-test.describe('QA Analysis Workflow', () => {
-  test('should start and complete analysis', async ({ page }) => {
-    await page.goto('/');
+    async def _aexecute_notebook(self, nb):
+        """Execute the notebook on the shared kernel, one run at a time."""
+        async with self._kernel_lock:
+            km, kc = await self._get_kernel()
+            await self._reset_kernel_namespace(kc)
+            client = NotebookClient(
+                nb,
+                km=km,
+                timeout=self.cell_timeout,
+                iopub_timeout=10,
+                interrupt_on_timeout=True,
+                shutdown_kernel="immediate",
+                kernel_name="python3",
+                allow_errors=True
+            )
+            client.kc = kc
+            execution = asyncio.ensure_future(client.async_execute())
+            done, _ = await asyncio.wait({execution}, timeout=self.total_timeout)
+            if not done:
+                # Cancelling alone leaves the kernel busy (and nbclient reports it as dead),
+                # so interrupt the running cell and abandon the rest of the notebook
+                await km.interrupt_kernel()
+                execution.cancel()
+                await asyncio.gather(execution, return_exceptions=True)
+                raise TimeoutError(f"Notebook execution exceeded {self.total_timeout:g}s")
+            execution.result()
     
-    // Start analysis
-    await page.locator('button:has-text("Start QA Analysis")').click();
+    async def _get_kernel(self):
+        """Return the shared kernel manager and client, (re)starting the kernel if needed."""
+        if self._km is None or not await self._km.is_alive():
+            await self._shutdown_kernel()
+            km = AsyncKernelManager(kernel_name="python3")
+            await km.start_kernel()
+            kc = km.client()
+            kc.start_channels()
+            try:
+                await kc.wait_for_ready(timeout=60)
+            except Exception:
+                kc.stop_channels()
+                await km.shutdown_kernel(now=True)
+                raise
+            self._km, self._kc = km, kc
+        return self._km, self._kc
     
-    // Verify run creation
-    await expect(page.locator('text=Analysis Started')).toBeVisible();
+    async def _reset_kernel_namespace(self, kc):
+        """Clear variables and modules left on the shared kernel by the previous run."""
+        # The aggressive reset announces itself on stdout; keep that out of the server log
+        reply = await kc.execute_interactive(
+            "import contextlib, io\n"
+            "with contextlib.redirect_stdout(io.StringIO()):\n"
+            "    get_ipython().reset(new_session=True, aggressive=True)",
+            silent=True,
+            store_history=False,
+            timeout=self.cell_timeout,
+        )
+        if reply["content"]["status"] != "ok":
+            raise RuntimeError(f"Could not reset notebook kernel: {reply['content'].get('evalue', '')}")
     
-    // Check progress
-    await expect(page.locator('[data-testid="agent-progress"]')).toBeVisible();
-  });
-
-  test('should display run results', async ({ page }) => {
-    await page.goto('/runs');
+    def _get_shell(self):
+        """Return the cached execnb shell, creating it on first use."""
+        if self._shell is None:
+            from execnb.shell import CaptureShell
+            
+            self._shell = CaptureShell()
+        return self._shell
     
-    // View run details
-    await page.locator('[data-testid="view-run"]').first().click();
+    async def _prewarm_kernel(self):
+        """Start the shared kernel ahead of the first notebook run."""
+        try:
+            async with self._kernel_lock:
+                await self._get_kernel()
+        except Exception as e:
+            logger.warning("Could not pre-warm notebook kernel: %s", e)
     
-    // Verify results display
-    await expect(page.locator('[data-testid="coverage-card"]')).toBeVisible();
-    await expect(page.locator('[data-testid="agents-progress"]')).toBeVisible();
-  });
-});
-
-test.describe('Error Handling', () => {
-  test('should handle invalid file uploads', async ({ page }) => {
-    await page.goto('/files');
+    async def _shutdown_kernel(self):
+        if self._kc is not None:
+            self._kc.stop_channels()
+            self._kc = None
+        if self._km is not None:
+            if self._km.has_kernel:
+                await self._km.shutdown_kernel(now=True)
+            self._km = None
     
-    // Try to upload invalid file
-    const fileInput = page.locator('input[type="file"]');
-    await fileInput.setInputFiles('test-files/invalid.txt');
+    def shutdown_kernel(self):
+        """Stop the shared notebook kernel if one is running."""
+        if self._km is None or not self._kernel_loop.is_running():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown_kernel(), self._kernel_loop).result(timeout=30)
+        except Exception as e:
+            logger.warning("Could not shut down notebook kernel: %s", e)
     
-    // Verify error message
-    await expect(page.locator('text=Please upload a ZIP file')).toBeVisible();
-  });
-});
-"""
+    def _generate_mock_artifact(self, agent_key: str, agent_label: str, paths: List[str], timestamp: str) -> str:
+        """
+        Generate mock artifact content for each agent.
         
-        return playwright_tests
+        TODO: Replace with actual notebook cell execution results
+        TODO: Add configurable artifact templates
+        TODO: Integrate with real analysis data from notebook
+        """
+        template = _MOCK_ARTIFACT_TEMPLATES.get(agent_key, _DEFAULT_MOCK_ARTIFACT_TEMPLATE)
+        
+        return template.format(
+            agent_key=agent_key,
+            agent_label=agent_label,
+            timestamp=timestamp,
+            file_count=len(paths),
+            file_list="\n".join(f"- `{path}`: Source file detected" for path in paths[:10]),
+            more_files="..." if len(paths) > 10 else "",
+            coverage_list="\n".join(f"- `{path}`: 85-95% coverage" for path in paths[:5]),
+        )
     
-    async def _execute_tests(
+    async def analyze_code(
         self, 
         source_path: Path, 
-        selected_paths: List[str], 
-        custom_tests: Optional[str]
-    ) -> Dict[str, Any]:
-        """Execute the generated tests."""
-        # Simulate test execution
-        test_results = {
-            "total_tests": 24,
-            "passed": 22,
-            "failed": 1,
-            "skipped": 1,
-            "duration": "45.3s",
-            "test_suites": [
-                {
-                    "name": "File Upload and Management",
-                    "tests": 8,
-                    "passed": 8,
-                    "failed": 0
-                },
-                {
-                    "name": "QA Analysis Workflow", 
-                    "tests": 10,
-                    "passed": 9,
-                    "failed": 1
-                },
-                {
-                    "name": "Error Handling",
-                    "tests": 6,
-                    "passed": 5,
-                    "failed": 0,
-                    "skipped": 1
+        selected_paths: List[str],
+        use_notebook: int = 24,
+        custom_tests: Optional[str] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Run QA analysis on the provided source code.
+        
+        Args:
+            source_path: Path to the source code directory
+            selected_paths: List of specific paths to analyze
+            use_notebook: Notebook version (18 or 24)
+            custom_tests: Custom test specifications
+            
+        Yields:
+            Analysis progress updates
+        """
+        # Same mock agents and artifacts as run_agents, run concurrently on the event loop
+        timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
+        analysis_results = {}
+        
+        # Mark every agent as running, then run them concurrently
+        yield {
+            "agents": [{
+                "key": agent_info["key"],
+                "label": agent_info["label"],
+                "state": "running",
+                "message": f"Running {agent_info['label'].lower()}..."
+            } for agent_info in AGENTS]
+        }
+        
+        async def run_step(agent_info: Dict[str, str]):
+            try:
+                # Optionally simulate processing time
+                if self.simulate_delay:
+                    await asyncio.sleep(self.simulate_delay)
+                
+                result = self._generate_mock_artifact(agent_info["key"], agent_info["label"], selected_paths, timestamp)
+                return agent_info, result, None
+            except Exception as e:
+                return agent_info, None, e
+        
+        for step in asyncio.as_completed([run_step(agent_info) for agent_info in AGENTS]):
+            agent_info, result, error = await step
+            agent_key, agent_label = agent_info["key"], agent_info["label"]
+            
+            if error is None:
+                analysis_results[agent_key] = result
+                
+                # Update agent state to success
+                yield {
+                    "agents": [{
+                        "key": agent_key,
+                        "label": agent_label,
+                        "state": "success",
+                        "message": f"{agent_label} completed successfully"
+                    }]
                 }
-            ],
-            "failures": [
-                {
-                    "test": "should handle large file uploads",
-                    "error": "Timeout exceeded waiting for upload completion",
-                    "file": "upload.spec.ts:45"
+            else:
+                # Update agent state to error; the other agents are unaffected
+                yield {
+                    "agents": [{
+                        "key": agent_key,
+                        "label": agent_label,
+                        "state": "error",
+                        "message": f"Error in {agent_label.lower()}: {str(error)}"
+                    }],
+                    "errors": [f"{agent_label}: {str(error)}"]
                 }
-            ]
-        }
         
-        return test_results
-    
-    async def _analyze_coverage(
-        self, 
-        source_path: Path, 
-        selected_paths: List[str], 
-        custom_tests: Optional[str]
-    ) -> Coverage:
-        """Analyze test coverage."""
-        # Simulate coverage analysis
-        return Coverage(
-            overall_percentage=87.5,
-            statements_percentage=89.2,
-            functions_percentage=85.7,
-            branches_percentage=84.3,
-            coverage_collected=True,
-            source="c8"
-        )
-    
-    async def _generate_final_report(
-        self, 
-        source_path: Path, 
-        selected_paths: List[str], 
-        custom_tests: Optional[str]
-    ) -> str:
-        """Generate the final analysis report."""
-        report = f"""# QA Analysis Final Report
-
-## Executive Summary
-Analysis completed successfully on {len(selected_paths)} files.
-Overall code quality: **Good** (87.5% coverage)
-
-## Analysis Results
-- ✅ Code structure analysis: Completed
-- ✅ User story generation: 8 stories created
-- ✅ Gherkin scenarios: 12 scenarios generated
-- ✅ Test plan creation: Comprehensive plan developed
-- ✅ Playwright tests: 24 tests generated
-- ✅ Test execution: 22/24 tests passed
-- ✅ Coverage analysis: 87.5% overall coverage
-
-## Key Findings
-1. **High test coverage** achieved across most modules
-2. **Well-structured code** with clear separation of concerns
-3. **Good error handling** patterns identified
-4. **One test failure** requires attention (timeout issue)
-
-## Recommendations
-1. Fix the timeout issue in large file upload tests
-2. Increase branch coverage to 90%+
-3. Add performance tests for critical paths
-4. Consider adding integration tests for API endpoints
-
-## Test Coverage Breakdown
-- Statements: 89.2%
-- Functions: 85.7%
-- Branches: 84.3%
-- Lines: 87.5%
-
-## Generated Artifacts
-- User Stories: 8 comprehensive stories
-- Gherkin Scenarios: 12 test scenarios
-- Playwright Tests: 24 automated tests
-- Test Plan: Full testing strategy document
-
----
-*Report generated on {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC*
-"""
+        # Generate final results
+        final_coverage = Coverage(**_SIMULATED_COVERAGE)
+        file_statuses = self._generate_file_statuses(selected_paths)
         
-        return report
-    
-    def _generate_coverage_data(self) -> Coverage:
-        """Generate realistic coverage data."""
-        return Coverage(
-            overall_percentage=87.5,
-            statements_percentage=89.2,
-            functions_percentage=85.7,
-            branches_percentage=84.3,
-            coverage_collected=True,
-            source="c8"
-        )
+        yield {
+            "status": "completed",
+            "coverage": final_coverage,
+            "files": file_statuses,
+            "artifacts": analysis_results
+        }
     
     def _generate_file_statuses(self, selected_paths: List[str]) -> List[FileStatus]:
         """Generate file status information."""
-        statuses = []
-        
-        for i, path in enumerate(selected_paths):
-            # Simulate different status based on file
-            if i % 10 == 0:  # 10% error rate
-                status = "error"
-            elif i % 5 == 0:  # 20% warning rate
-                status = "warn"
-            else:
-                status = "passed"
-            
-            statuses.append(FileStatus(path=path, status=status))
-        
-        return statuses
+        # Simulated statuses by position: every 10th file errors, every other 5th warns.
+        # Validating the whole list in one call is cheaper than one model per file.
+        return _FILE_STATUS_LIST.validate_python([
+            {"path": path, "status": status}
+            for path, status in zip(selected_paths, cycle(_FILE_STATUS_CYCLE))
+        ])
 
 
 # Global adapter instance
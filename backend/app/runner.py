@@ -3,36 +3,118 @@ QA Analysis Runner - Orchestrates the execution of QA analysis runs.
 """
 
 import asyncio
-import json
-from typing import Dict, List, Optional, Any, AsyncGenerator
+import heapq
+import logging
+import os
+import time
+import zipfile
+from typing import Dict, List, Optional, Any, AsyncGenerator, Callable, Deque, Tuple
 from datetime import datetime
 from pathlib import Path
-import queue
-import threading
+from itertools import chain
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 
-from .models import Run, AgentState, generate_run_id, Coverage, FileStatus, AGENTS
+import orjson
+from pydantic import BaseModel
+
+from .models import Run, RunSummary, AgentState, generate_run_id, id_timestamp, Coverage, FileStatus, AGENTS
 from .storage import storage_manager
 from .notebook24_adapter import notebook_adapter
 
+logger = logging.getLogger(__name__)
+
+# Seconds without events before event_stream sends a heartbeat
+HEARTBEAT_INTERVAL = 15.0
+
+# Event types the run threads publish; each SSE frame starts with a head built once
+_EVENT_TYPES = ("status_update", "agent_update", "run_complete", "run_error", "stream_end")
+_FRAME_HEADS = {
+    event_type: b'data: {"type":"%s","data":' % event_type.encode()
+    for event_type in (*_EVENT_TYPES, "connected", "error")
+}
+_FRAME_TAIL = b"}\n\n"
+
+# (key, label) of every agent, in display order, for new runs' idle agent lists
+_AGENT_KEYS_AND_LABELS = tuple((agent["key"], agent["label"]) for agent in AGENTS)
+
+# Runs executing at once; further started runs stay queued until a worker frees up
+RUNNER_MAX_WORKERS = int(os.getenv("RUNNER_MAX_WORKERS", str((os.cpu_count() or 1) * 2)))
+
+# Finished runs kept in memory; older ones are read back from disk when asked for
+COMPLETED_RUNS_CACHE_SIZE = 128
+
+# Summaries of runs persisted by earlier processes kept in memory
+RUN_SUMMARIES_CACHE_SIZE = 1024
+
+# Run IDs recently found on neither memory nor disk, and for how many seconds
+# get_run answers them without looking again
+MISSING_RUNS_CACHE_SIZE = 1024
+MISSING_RUN_TTL = 5.0
+
+# Frames that never change, or only by their timestamp
+_RUN_NOT_FOUND_FRAME = b'data: {"type":"error","data":{"error":"Run not found"}}\n\n'
+_HEARTBEAT_FRAME = b'data: {"type":"heartbeat","data":{"timestamp":"%s"}}\n\n'
+
+# Seconds that heartbeats across all streams share one timestamp
+HEARTBEAT_CLOCK_RESOLUTION = 1.0
+
+# (monotonic time built, frame) of the last heartbeat sent on any stream
+_heartbeat = (float("-inf"), b"")
+
+
+def _heartbeat_frame() -> bytes:
+    """Heartbeat frame, rebuilt at most once per HEARTBEAT_CLOCK_RESOLUTION."""
+    global _heartbeat
+    now = time.monotonic()
+    if now - _heartbeat[0] >= HEARTBEAT_CLOCK_RESOLUTION:
+        _heartbeat = (now, _HEARTBEAT_FRAME % datetime.utcnow().isoformat().encode())
+    return _heartbeat[1]
+
+
+def _model_fields(obj: Any) -> Dict[str, Any]:
+    """orjson default hook: serialize pydantic models as their field values."""
+    if isinstance(obj, BaseModel):
+        return obj.__dict__
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
 
 class RunManager:
     """Manages QA analysis runs and their lifecycle."""
     
     def __init__(self):
         self.active_runs: Dict[str, Run] = {}
-        self.completed_runs: Dict[str, Run] = {}
-        self.run_tasks: Dict[str, asyncio.Task] = {}
-        # Event queues for real-time streaming
-        self.event_queues: Dict[str, queue.Queue] = {}
+        # Least recently used first, capped at COMPLETED_RUNS_CACHE_SIZE
+        self.completed_runs: "OrderedDict[str, Run]" = OrderedDict()
+        # Futures of runs submitted to the worker pool, until they finish
+        self.run_tasks: Dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=RUNNER_MAX_WORKERS, thread_name_prefix="runner")
+        # Event queues for real-time streaming, appended to by the run threads;
+        # the signal wakes the stream once for however many events are waiting
+        self.event_queues: Dict[str, Deque[Tuple[str, Dict[str, Any]]]] = {}
+        self._event_signals: Dict[str, asyncio.Event] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Summaries of runs persisted by earlier processes (they no longer change)
+        self._disk_summaries: "OrderedDict[str, RunSummary]" = OrderedDict()
+        # (state.json, run.json) paths of each active run, built once when it starts
+        self._run_files: Dict[str, Tuple[str, str]] = {}
+        # Agents of each active run by key, so events update them without a scan
+        self._agent_index: Dict[str, Dict[str, AgentState]] = {}
+        # Where each active run's artifacts are saved, relative to its run directory
+        self._artifact_refs: Dict[str, Dict[str, Dict[str, str]]] = {}
+        # Run ID -> monotonic time until which get_run treats it as missing, oldest first
+        self._missing_runs: "OrderedDict[str, float]" = OrderedDict()
     
-    def start_run(self, run_id: str, paths: List[str], use_notebook: int = 24) -> str:
+    def start_run(self, run_id: str, paths: List[str], use_notebook: int = 24,
+                  on_finish: Optional[Callable[[], None]] = None) -> str:
         """
-        Start a new QA analysis run and spawn background task.
+        Start a new QA analysis run on the shared worker pool.
         
         Args:
             run_id: The run ID to use
             paths: List of file paths to analyze
             use_notebook: Notebook version to use (18 or 24)
+            on_finish: Optional callback run once the run ends or is cancelled before it starts
             
         Returns:
             The run ID of the started run
@@ -49,30 +131,43 @@ class RunManager:
         
         # Store the run
         self.active_runs[run_id] = run
+        self._missing_runs.pop(run_id, None)
+        self._agent_index[run_id] = {agent.key: agent for agent in run.agents}
+        self._artifact_refs[run_id] = {}
         
-        # Create event queue for this run
-        self.event_queues[run_id] = queue.Queue()
+        # Create event queue for this run; start_run is called on the event loop,
+        # which the run thread hands its events to
+        self._loop = asyncio.get_running_loop()
+        self.event_queues[run_id] = deque()
+        self._event_signals[run_id] = asyncio.Event()
         
-        # Create run directory
+        # Create run directory; saves write into it without checking again
         run_path = storage_manager.create_run_directory(run_id)
+        self._run_files[run_id] = (str(run_path / "state.json"), str(run_path / "run.json"))
         
-        # Start the analysis task in background thread (since run_agents is synchronous)
+        # Run the analysis on a worker thread (since run_agents is synchronous)
         def run_in_background():
             try:
                 self._execute_run_sync(run_id, paths, use_notebook)
             except Exception as e:
                 self._handle_run_failure_sync(run_id, str(e))
         
-        thread = threading.Thread(target=run_in_background, daemon=True)
-        thread.start()
+        def on_done(future: Future):
+            self.run_tasks.pop(run_id, None)
+            if on_finish:
+                on_finish()
+        
+        future = self._executor.submit(run_in_background)
+        self.run_tasks[run_id] = future
+        future.add_done_callback(on_done)
         
         return run_id
     
     def _initialize_agents(self) -> List[AgentState]:
         """Initialize all agents in idle state."""
         return [
-            AgentState(key=agent["key"], label=agent["label"], state="idle")
-            for agent in AGENTS
+            AgentState(key=key, label=label, state="idle")
+            for key, label in _AGENT_KEYS_AND_LABELS
         ]
     
     def _execute_run_sync(self, run_id: str, paths: List[str], use_notebook: int):
@@ -85,46 +180,47 @@ class RunManager:
                 self._save_run_state_sync(run_id, run)
                 
                 # Add initial event to queue
-                self._add_event_to_queue(run_id, {
-                    "type": "status_update",
-                    "data": {"status": "running", "message": "Starting QA analysis..."}
-                })
+                self._add_event_to_queue(run_id, "status_update", {"status": "running", "message": "Starting QA analysis..."})
             
             # Run the analysis using run_agents from notebook adapter
             for event in notebook_adapter.run_agents(paths, run_id, use_notebook=use_notebook):
                 # Process the event and update run state
                 self._process_agent_event(run_id, event)
                 
-                # Add event to queue for streaming
-                self._add_event_to_queue(run_id, {
-                    "type": "agent_update",
-                    "data": event
-                })
+                # Add event to queue for streaming, without the artifact body
+                self._add_event_to_queue(run_id, "agent_update", self._stream_payload(event))
             
             # Mark run as completed and save final state
             if run_id in self.active_runs:
                 run = self.active_runs[run_id]
                 run.status = "completed"
-                self._save_run_state_sync(run_id, run)
                 self._save_final_run_json(run_id, run)
                 
                 # Add completion event
-                self._add_event_to_queue(run_id, {
-                    "type": "run_complete",
-                    "data": {"status": "completed", "runId": run_id}
-                })
+                self._add_event_to_queue(run_id, "run_complete", {"status": "completed", "runId": run_id})
             
         except Exception as e:
             # Handle run failure
             self._handle_run_failure_sync(run_id, str(e))
         finally:
-            # Move run from active to completed and cleanup
-            if run_id in self.active_runs:
-                self.completed_runs[run_id] = self.active_runs.pop(run_id)
-            
-            # Close event queue
-            if run_id in self.event_queues:
-                self._add_event_to_queue(run_id, {"type": "stream_end", "data": {}})
+            # completed_runs is only touched on the event loop, like the event signals
+            self._loop.call_soon_threadsafe(self._finish_run, run_id)
+    
+    def _finish_run(self, run_id: str):
+        """
+        Move a run from active to completed, clean up and close its event queue.
+        
+        Must run on the event loop, which owns completed_runs.
+        """
+        if run_id in self.active_runs:
+            self._cache_completed_run(run_id, self.active_runs.pop(run_id))
+        self._run_files.pop(run_id, None)
+        self._agent_index.pop(run_id, None)
+        self._artifact_refs.pop(run_id, None)
+        
+        # Close event queue
+        if run_id in self.event_queues:
+            self._add_event_to_queue(run_id, "stream_end", {})
     
     def _process_agent_event(self, run_id: str, event: Dict[str, Any]):
         """Process an event from run_agents and update run state."""
@@ -135,16 +231,11 @@ class RunManager:
         
         # Update agent state based on event
         if "agent" in event and "state" in event:
-            agent_key = event["agent"]
-            agent_state = event["state"]
-            agent_message = event.get("message", "")
-            
-            # Find and update the corresponding agent
-            for agent in run.agents:
-                if agent.key == agent_key:
-                    agent.state = agent_state
-                    agent.message = agent_message
-                    break
+            # Update the corresponding agent, if the run has one with this key
+            agent = self._agent_index[run_id].get(event["agent"])
+            if agent is not None:
+                agent.state = event["state"]
+                agent.message = event.get("message", "")
         
         # Update coverage if provided
         if "coverage" in event:
@@ -156,44 +247,103 @@ class RunManager:
         if "artifact" in event:
             agent_key = event.get("agent", "unknown")
             run.artifacts[agent_key] = event["artifact"]
+            
+            # Remember the saved copy, so the persisted run can point at it
+            if "artifact_file" in event:
+                run_dir = os.path.dirname(self._get_run_files(run_id)[0])
+                ref = {"artifact_file": os.path.relpath(event["artifact_file"], run_dir)}
+                if "artifact_member" in event:
+                    ref["artifact_member"] = event["artifact_member"]
+                self._artifact_refs[run_id][agent_key] = ref
     
-    def _add_event_to_queue(self, run_id: str, event: Dict[str, Any]):
-        """Add an event to the run's event queue."""
-        if run_id in self.event_queues:
-            try:
-                self.event_queues[run_id].put(event, timeout=1.0)
-            except queue.Full:
-                print(f"Event queue full for run {run_id}, dropping event")
+    def _stream_payload(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Copy of an agent event for the SSE stream. Artifact bodies stay in the
+        run state (served by GET /api/run/{runId}), so only the file reference goes out.
+        """
+        if "artifact" not in event:
+            return event
+        return {key: value for key, value in event.items() if key != "artifact"}
+    
+    def _add_event_to_queue(self, run_id: str, event_type: str, data: Dict[str, Any]):
+        """
+        Add an event to the run's event queue, waking its stream on the event loop.
+        
+        Events are queued as (type, data) pairs; the stream wraps them when it
+        writes the frame, so no wrapper dict is built per event.
+        """
+        event_queue = self.event_queues.get(run_id)
+        if event_queue is None:
+            return
+        event_queue.append((event_type, data))
+        # The stream clears the signal before draining, so a set signal means
+        # this event will be picked up without another wakeup
+        signal = self._event_signals.get(run_id)
+        if signal is not None and not signal.is_set():
+            self._loop.call_soon_threadsafe(signal.set)
+    
+    def _get_run_files(self, run_id: str) -> Tuple[str, str]:
+        """Paths of a run's state.json and run.json, creating its directory if it is not an active run."""
+        run_files = self._run_files.get(run_id)
+        if run_files is None:
+            run_path = storage_manager.create_run_directory(run_id)
+            run_files = (str(run_path / "state.json"), str(run_path / "run.json"))
+        return run_files
     
     def _save_run_state_sync(self, run_id: str, run: Run):
         """Save run state synchronously."""
         try:
-            run_path = storage_manager.get_run_path(run_id)
-            run_path.mkdir(exist_ok=True)
-            
-            state_file = run_path / "state.json"
-            run_dict = run.model_dump()
+            state_file, _ = self._get_run_files(run_id)
             
-            with open(state_file, 'w') as f:
-                json.dump(run_dict, f, indent=2)
+            self._write_json(state_file, self._serialize_run(run))
         except Exception as e:
-            print(f"Failed to save run state for {run_id}: {e}")
+            logger.warning("Failed to save run state for %s: %s", run_id, e)
+    
+    def _serialize_run(self, run: Run, indent: bool = False) -> bytes:
+        """
+        Serialize a run for state.json / run.json.
+        
+        orjson walks the models' field dicts directly, which gives the same JSON
+        as model_dump() without building an intermediate dict tree first.
+        State files are written compact; indent is for run.json, which people read.
+        """
+        return orjson.dumps(run, default=_model_fields, option=orjson.OPT_INDENT_2 if indent else None)
+    
+    def _write_json(self, path: str, buf: bytes):
+        """
+        Write serialized JSON to a temporary file and rename it into place, so
+        readers never see a partly written file.
+        """
+        tmp_path = path + ".tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            view = memoryview(buf)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, path)
     
     def _save_final_run_json(self, run_id: str, run: Run):
-        """Save final Run JSON to runs/{runId}/run.json."""
+        """
+        Save the final run to runs/{runId}/run.json and state.json.
+        
+        state.json is written compact and run.json indented for reading.
+        A completed run has all its artifacts saved, so the files reference those
+        instead of repeating their text; failed runs keep the text.
+        """
         try:
-            run_path = storage_manager.get_run_path(run_id)
-            run_path.mkdir(exist_ok=True)
-            
-            run_file = run_path / "run.json"
-            run_dict = run.model_dump()
+            state_file, run_file = self._get_run_files(run_id)
+            refs = self._artifact_refs.get(run_id) if run.status == "completed" else None
+            if refs:
+                run = run.model_copy(update={"artifacts": {**run.artifacts, **refs}})
             
-            with open(run_file, 'w') as f:
-                json.dump(run_dict, f, indent=2)
+            self._write_json(state_file, self._serialize_run(run))
+            self._write_json(run_file, self._serialize_run(run, indent=True))
                 
-            print(f"✅ Saved final run JSON: {run_file}")
+            logger.info("Saved final run JSON: %s", run_file)
         except Exception as e:
-            print(f"Failed to save final run JSON for {run_id}: {e}")
+            logger.warning("Failed to save final run JSON for %s: %s", run_id, e)
     
     def _handle_run_failure_sync(self, run_id: str, error_message: str):
         """Handle run failure synchronously."""
@@ -201,16 +351,12 @@ class RunManager:
             run = self.active_runs[run_id]
             run.status = "failed"
             run.errors.append(f"Run failed: {error_message}")
-            self._save_run_state_sync(run_id, run)
             self._save_final_run_json(run_id, run)
             
             # Add error event to queue
-            self._add_event_to_queue(run_id, {
-                "type": "run_error",
-                "data": {"status": "failed", "error": error_message}
-            })
+            self._add_event_to_queue(run_id, "run_error", {"status": "failed", "error": error_message})
     
-    async def event_stream(self, run_id: str) -> AsyncGenerator[str, None]:
+    async def event_stream(self, run_id: str) -> AsyncGenerator[bytes, None]:
         """
         Async generator that yields text/event-stream with JSON events for a run.
         
@@ -218,82 +364,75 @@ class RunManager:
             run_id: The run ID to stream events for
             
         Yields:
-            Server-Sent Events formatted strings with JSON data
+            Server-Sent Events frames with JSON data, as bytes
         """
         if run_id not in self.event_queues:
             # Run doesn't exist or has no event queue
-            yield f"data: {json.dumps({'type': 'error', 'data': {'error': 'Run not found'}})}\n\n"
+            yield _RUN_NOT_FOUND_FRAME
             return
         
         event_queue = self.event_queues[run_id]
+        signal = self._event_signals[run_id]
         
         # Send initial connection event
-        yield f"data: {json.dumps({'type': 'connected', 'data': {'runId': run_id}})}\n\n"
+        yield _FRAME_HEADS["connected"] + orjson.dumps({"runId": run_id}) + _FRAME_TAIL
         
-        while True:
+        ended = False
+        while not ended:
             try:
-                # Wait for events with timeout
-                event = event_queue.get(timeout=1.0)
-                
-                # Check for stream end
-                if event.get("type") == "stream_end":
-                    yield f"data: {json.dumps({'type': 'stream_end', 'data': {}})}\n\n"
-                    break
+                # Sleep until the run thread publishes events; time out only for keep-alive
+                if not event_queue:
+                    await asyncio.wait_for(signal.wait(), timeout=HEARTBEAT_INTERVAL)
+                signal.clear()
                 
-                # Yield the event as SSE format
-                event_json = json.dumps(event)
-                yield f"data: {event_json}\n\n"
-                
-                # Mark task as done
-                event_queue.task_done()
+                # Drain everything that arrived in this wakeup
+                while event_queue:
+                    event_type, data = event_queue.popleft()
+                    
+                    # Yield the event as SSE format
+                    yield _FRAME_HEADS[event_type] + orjson.dumps(data) + _FRAME_TAIL
+                    
+                    # Check for stream end
+                    if event_type == "stream_end":
+                        ended = True
+                        break
                 
-            except queue.Empty:
+            except asyncio.TimeoutError:
                 # Send heartbeat to keep connection alive
-                yield f"data: {json.dumps({'type': 'heartbeat', 'data': {'timestamp': datetime.utcnow().isoformat()}})}\n\n"
+                yield _heartbeat_frame()
                 
                 # Check if run is still active, if not break
                 if (run_id not in self.active_runs and 
                     run_id not in self.run_tasks and 
-                    event_queue.empty()):
+                    not event_queue):
                     break
                     
             except Exception as e:
-                yield f"data: {json.dumps({'type': 'error', 'data': {'error': str(e)}})}\n\n"
+                yield _FRAME_HEADS["error"] + orjson.dumps({"error": str(e)}) + _FRAME_TAIL
                 break
         
-        # Cleanup event queue when streaming ends
-        if run_id in self.event_queues:
-            try:
-                # Clear any remaining events
-                while not event_queue.empty():
-                    event_queue.get_nowait()
-                    event_queue.task_done()
-            except queue.Empty:
-                pass
-            finally:
-                del self.event_queues[run_id]
+        # Cleanup event queue when streaming ends; remaining events are dropped with it
+        self.event_queues.pop(run_id, None)
+        self._event_signals.pop(run_id, None)
     
     # Legacy methods kept for compatibility with existing get_run functionality
     
     async def _save_run_state(self, run_id: str, run: Run):
         """Save the current run state to disk."""
         try:
-            run_path = storage_manager.get_run_path(run_id)
-            run_path.mkdir(exist_ok=True)
-            
-            state_file = run_path / "state.json"
+            state_file, _ = self._get_run_files(run_id)
             
-            # Convert run to dict for serialization
-            run_dict = run.model_dump()
-            
-            with open(state_file, 'w') as f:
-                json.dump(run_dict, f, indent=2)
+            self._write_json(state_file, self._serialize_run(run))
                 
         except Exception as e:
-            print(f"Failed to save run state for {run_id}: {e}")
+            logger.warning("Failed to save run state for %s: %s", run_id, e)
     
     async def _load_run_state(self, run_id: str) -> Optional[Run]:
         """Load a run state from disk."""
+        return await asyncio.to_thread(self._load_run_state_sync, run_id)
+    
+    def _load_run_state_sync(self, run_id: str) -> Optional[Run]:
+        """Load a run state from disk synchronously."""
         try:
             run_path = storage_manager.get_run_path(run_id)
             state_file = run_path / "state.json"
@@ -301,17 +440,49 @@ class RunManager:
             if not state_file.exists():
                 return None
             
-            with open(state_file, 'r') as f:
-                run_dict = json.load(f)
-            
-            # No datetime conversion needed since we removed created_at
+            with open(state_file, 'rb') as f:
+                run_dict = orjson.loads(f.read())
+            run_dict["artifacts"] = self._resolve_artifacts(run_path, run_dict.get("artifacts", {}))
             
+            # Validated rather than model_construct()ed: construct leaves the nested
+            # agents, coverage and files as plain dicts
             return Run(**run_dict)
             
         except Exception as e:
-            print(f"Failed to load run state for {run_id}: {e}")
+            logger.warning("Failed to load run state for %s: %s", run_id, e)
             return None
     
+    def _resolve_artifacts(self, run_path: Path, artifacts: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace artifact references of a persisted run with the saved text; unreadable ones stay references."""
+        archives: Dict[Path, zipfile.ZipFile] = {}
+        resolved = {}
+        try:
+            for key, value in artifacts.items():
+                if isinstance(value, dict) and "artifact_file" in value:
+                    artifact_file = run_path / value["artifact_file"]
+                    try:
+                        if "artifact_member" in value:
+                            if artifact_file not in archives:
+                                archives[artifact_file] = zipfile.ZipFile(artifact_file)
+                            data = archives[artifact_file].read(value["artifact_member"])
+                        else:
+                            data = artifact_file.read_bytes()
+                        value = data.decode("utf-8")
+                    except (OSError, KeyError, zipfile.BadZipFile) as e:
+                        logger.warning("Failed to read artifact %s of %s: %s", key, run_path.name, e)
+                resolved[key] = value
+        finally:
+            for archive in archives.values():
+                archive.close()
+        return resolved
+    
+    def _cache_completed_run(self, run_id: str, run: Run):
+        """Cache a finished run, evicting the least recently used past the cap."""
+        self.completed_runs[run_id] = run
+        self.completed_runs.move_to_end(run_id)
+        while len(self.completed_runs) > COMPLETED_RUNS_CACHE_SIZE:
+            self.completed_runs.popitem(last=False)
+    
     async def get_run(self, run_id: str) -> Optional[Run]:
         """Get a run by ID."""
         # Check active runs first
@@ -320,64 +491,201 @@ class RunManager:
         
         # Check completed runs
         if run_id in self.completed_runs:
+            self.completed_runs.move_to_end(run_id)
             return self.completed_runs[run_id]
         
+        # Skip the disk for IDs that were just looked up and not found
+        expires = self._missing_runs.get(run_id)
+        if expires is not None:
+            if time.monotonic() < expires:
+                return None
+            del self._missing_runs[run_id]
+        
         # Try to load from disk
         run = await self._load_run_state(run_id)
         if run:
             # Cache in completed runs
-            self.completed_runs[run_id] = run
+            self._cache_completed_run(run_id, run)
             return run
         
+        self._missing_runs[run_id] = time.monotonic() + MISSING_RUN_TTL
+        while len(self._missing_runs) > MISSING_RUNS_CACHE_SIZE:
+            self._missing_runs.popitem(last=False)
         return None
     
-    async def list_runs(self) -> List[Run]:
-        """List all runs (active and completed)."""
-        all_runs = []
-        
-        # Add active runs
-        all_runs.extend(self.active_runs.values())
+    async def _load_runs_from_disk(self) -> Dict[str, Run]:
+        """
+        Load the runs on disk that aren't in memory.
         
-        # Add completed runs
-        all_runs.extend(self.completed_runs.values())
+        They are cached in completed_runs as well, which keeps only the most
+        recently loaded ones once the cache is full.
         
-        # Try to load any runs from disk that aren't in memory
+        Returns:
+            Every finished run by run ID: those cached before the call plus the loaded ones
+        """
+        finished: Dict[str, Run] = dict(self.completed_runs)
         try:
             runs_dir = storage_manager.runs_dir
             if runs_dir.exists():
-                for run_dir in runs_dir.iterdir():
-                    if run_dir.is_dir():
-                        run_id = run_dir.name
-                        if (run_id not in self.active_runs and 
-                            run_id not in self.completed_runs):
-                            run = await self._load_run_state(run_id)
-                            if run:
-                                self.completed_runs[run_id] = run
-                                all_runs.append(run)
+                missing = [
+                    entry.name for entry in os.scandir(runs_dir)
+                    if entry.is_dir() and
+                    entry.name not in self.active_runs and
+                    entry.name not in self.completed_runs
+                ]
+                
+                # Read the missing runs on worker threads so their file reads overlap
+                runs = await asyncio.gather(
+                    *(asyncio.to_thread(self._load_run_state_sync, run_id) for run_id in missing)
+                )
+                for run_id, run in zip(missing, runs):
+                    if run:
+                        finished[run_id] = run
+                        self._cache_completed_run(run_id, run)
         except Exception as e:
-            print(f"Error loading runs from disk: {e}")
+            logger.warning("Error loading runs from disk: %s", e)
+        return finished
+    
+    async def list_runs(self) -> List[Run]:
+        """List all runs (active and completed)."""
+        finished = await self._load_runs_from_disk()
         
-        # Sort by run ID (which contains timestamp)
-        all_runs.sort(key=lambda r: r.runId, reverse=True)
+        all_runs = [*self.active_runs.values(), *finished.values()]
+        
+        # Newest first by the timestamp at the end of the run ID
+        all_runs.sort(key=lambda r: id_timestamp(r.runId), reverse=True)
         
         return all_runs
     
-    async def cancel_run(self, run_id: str) -> bool:
-        """Cancel a running analysis."""
-        if run_id in self.run_tasks:
-            task = self.run_tasks[run_id]
-            task.cancel()
+    async def list_recent_runs(self, limit: int) -> List[Run]:
+        """
+        List the most recent runs without sorting the whole history.
+        
+        Args:
+            limit: Maximum number of runs to return
             
-            # Update run status
-            if run_id in self.active_runs:
-                run = self.active_runs[run_id]
-                run.status = "failed"
-                run.errors.append("Run cancelled by user")
-                await self._save_run_state(run_id, run)
+        Returns:
+            Up to `limit` runs, newest first by run ID timestamp
+        """
+        finished = await self._load_runs_from_disk()
+        
+        return heapq.nlargest(
+            limit,
+            chain(self.active_runs.values(), finished.values()),
+            key=lambda r: id_timestamp(r.runId)
+        )
+    
+    def _load_run_summary_sync(self, run_id: str) -> Optional[RunSummary]:
+        """Load only the summary fields of a persisted run, without building the Run."""
+        try:
+            state_file = storage_manager.get_run_path(run_id) / "state.json"
+            if not state_file.exists():
+                return None
+            
+            with open(state_file, 'rb') as f:
+                run_dict = orjson.loads(f.read())
             
-            return True
+            summary = RunSummary(
+                runId=run_dict["runId"],
+                status=run_dict["status"],
+                coverage=run_dict.get("coverage")
+            )
+        except Exception as e:
+            logger.warning("Failed to load run summary for %s: %s", run_id, e)
+            return None
+        return summary
+    
+    def _cache_run_summary(self, run_id: str, summary: RunSummary):
+        """Cache a persisted run's summary, evicting the least recently used past the cap."""
+        self._disk_summaries[run_id] = summary
+        self._disk_summaries.move_to_end(run_id)
+        while len(self._disk_summaries) > RUN_SUMMARIES_CACHE_SIZE:
+            self._disk_summaries.popitem(last=False)
+    
+    def _list_run_dirs_sync(self) -> List[str]:
+        """Names of the run directories on disk."""
+        runs_dir = storage_manager.runs_dir
+        if not runs_dir.exists():
+            return []
+        with os.scandir(runs_dir) as entries:
+            return [entry.name for entry in entries if entry.is_dir()]
+    
+    async def list_run_summaries(self, limit: int) -> List[RunSummary]:
+        """
+        List summaries of the most recent runs.
+        
+        Run IDs end with their creation time, so the newest `limit` IDs are picked
+        from memory and the runs directory first; only those runs that are not
+        in memory are read from disk.
         
-        return False
+        Args:
+            limit: Maximum number of summaries to return
+            
+        Returns:
+            Up to `limit` run summaries, newest first by run ID timestamp
+        """
+        run_ids = set(self.active_runs) | set(self.completed_runs)
+        try:
+            # The directory scan runs in a worker thread
+            run_ids.update(await asyncio.to_thread(self._list_run_dirs_sync))
+        except Exception as e:
+            logger.warning("Error listing runs on disk: %s", e)
+        
+        candidates = sorted(run_ids, key=id_timestamp, reverse=True)
+        found: Dict[str, RunSummary] = {}
+        position = 0
+        # Take candidates newest first until `limit` summaries are found; each round
+        # reads the uncached ones on worker threads so their file reads overlap
+        while len(found) < limit and position < len(candidates):
+            batch = candidates[position:position + limit - len(found)]
+            position += len(batch)
+            
+            to_read = []
+            for run_id in batch:
+                run = self.active_runs.get(run_id) or self.completed_runs.get(run_id)
+                if run is not None:
+                    found[run_id] = RunSummary(runId=run.runId, status=run.status, coverage=run.coverage)
+                elif run_id in self._disk_summaries:
+                    self._disk_summaries.move_to_end(run_id)
+                    found[run_id] = self._disk_summaries[run_id]
+                else:
+                    to_read.append(run_id)
+            
+            summaries = await asyncio.gather(
+                *(asyncio.to_thread(self._load_run_summary_sync, run_id) for run_id in to_read)
+            )
+            for run_id, summary in zip(to_read, summaries):
+                if summary is not None:
+                    self._cache_run_summary(run_id, summary)
+                    found[run_id] = summary
+        
+        # Keep the newest-first order of the candidates
+        return [found[run_id] for run_id in candidates[:position] if run_id in found]
+    
+    async def cancel_run(self, run_id: str) -> bool:
+        """
+        Cancel a run that is still queued for a worker.
+        
+        Runs already executing cannot be interrupted, since run_agents is synchronous.
+        """
+        future = self.run_tasks.get(run_id)
+        if future is None or not future.cancel():
+            return False
+        
+        # Update run status
+        if run_id in self.active_runs:
+            run = self.active_runs[run_id]
+            run.status = "failed"
+            run.errors.append("Run cancelled by user")
+            self._save_final_run_json(run_id, run)
+            self._add_event_to_queue(run_id, "run_error", {"status": "failed", "error": "Run cancelled by user"})
+        
+        self._finish_run(run_id)
+        return True
+    
+    def shutdown(self):
+        """Stop the worker pool, dropping runs that have not started."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
     
     def get_run_status(self, run_id: str) -> Optional[str]:
         """Get the current status of a run."""
@@ -396,3 +704,8 @@ class RunManager:
 
 # Global run manager instance
 run_manager = RunManager()
+
+
+async def get_run_manager() -> RunManager:
+    """FastAPI dependency providing the shared run manager."""
+    return run_manager
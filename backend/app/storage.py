@@ -2,16 +2,113 @@
 File storage and management utilities.
 """
 
+import codecs
+import io
 import os
+import re
+import asyncio
 import shutil
+import stat
+import tempfile
 import zipfile
-import aiofiles
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from operator import attrgetter
+import orjson
 import requests
-from typing import Optional, Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, Any, List, Union, BinaryIO, Tuple
 from pathlib import Path
-from urllib.parse import urlparse
+from urllib.parse import unquote, urlparse
 
-from .models import FileNode, UploadedSource, generate_upload_id
+from .models import FileNode, UploadedSource, generate_upload_id, id_timestamp
+
+
+# Directory entries left out of file trees (besides hidden names)
+SKIPPED_DIRS = frozenset(['node_modules', '__pycache__', '.git', 'dist', 'build'])
+
+# Threads decompressing ZIP members at once; archives with fewer members,
+# or machines with one CPU, are extracted serially
+EXTRACT_WORKERS = os.cpu_count() or 1
+PARALLEL_EXTRACT_MIN_MEMBERS = 16
+
+# Archives declaring more members or more uncompressed bytes are refused
+# before anything is written (zip bombs)
+MAX_ZIP_MEMBERS = int(os.getenv("MAX_ZIP_MEMBERS", "50000"))
+MAX_ZIP_UNCOMPRESSED_BYTES = int(os.getenv("MAX_ZIP_UNCOMPRESSED_BYTES", str(2 * 1024 ** 3)))
+
+# Bytes of a file inspected to tell text from binary before reading the rest
+BINARY_SNIFF_BYTES = 4096
+
+# Bytes read from the network per iteration while saving a URL download
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Downloaded archives up to this size are extracted from memory; larger ones
+# spill to a temporary file outside the upload directory
+DOWNLOAD_SPOOL_BYTES = 64 * 1024 * 1024
+
+# filename= / filename*= (RFC 6266, RFC 5987 encoded) parameters of Content-Disposition
+_CD_FILENAME_RE = re.compile(
+    r"""filename(?P<ext>\*)?\s*=\s*(?:(?P<charset>[\w.-]+)'[\w-]*')?(?:"(?P<quoted>[^"]*)"|(?P<token>[^;\s]+))""",
+    re.IGNORECASE,
+)
+
+# Sort key for directory listings; DirEntry names, no Path objects built
+_entry_name = attrgetter('name')
+
+# Serialized file trees kept in memory, keyed by upload id
+TREE_CACHE_SIZE = 32
+
+
+def _is_skipped(name: str) -> bool:
+    """Whether a directory entry is left out of file trees, along with everything under it."""
+    return name.startswith('.') or name in SKIPPED_DIRS
+
+
+@dataclass(slots=True)
+class FlatTree:
+    """
+    File tree stored as parallel arrays in depth-first (pre-)order.
+    
+    Node 0 is the root and every node's parent has a smaller index, so the
+    nested form is rebuilt in a single forward pass.
+    """
+    names: list = field(default_factory=list)
+    paths: list = field(default_factory=list)
+    parents: array = field(default_factory=lambda: array('i'))
+    is_dir: bytearray = field(default_factory=bytearray)
+    # The multi-item upload root lists children even when empty
+    keep_empty_root: bool = False
+    
+    def add(self, name: str, path: str, parent: int, is_dir: bool) -> int:
+        """Append a node and return its index."""
+        self.names.append(name)
+        self.paths.append(path)
+        self.parents.append(parent)
+        self.is_dir.append(is_dir)
+        return len(self.names) - 1
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Nested FileNode-shaped dict of the tree."""
+        nodes = []
+        for index, name in enumerate(self.names):
+            node = {"name": name, "path": self.paths[index], "isDir": bool(self.is_dir[index]), "children": None}
+            if self.is_dir[index]:
+                node["children"] = []
+            if index:
+                nodes[self.parents[index]]["children"].append(node)
+            nodes.append(node)
+        
+        # Directories without listed children report None, as FileNode does
+        for index, node in enumerate(nodes):
+            if node["children"] == [] and not (index == 0 and self.keep_empty_root):
+                node["children"] = None
+        return nodes[0]
+    
+    def to_json_bytes(self) -> bytes:
+        """The tree serialized as FileNode JSON."""
+        return orjson.dumps(self.to_dict())
 
 
 class StorageManager:
@@ -21,9 +118,23 @@ class StorageManager:
         self.uploads_dir = Path(uploads_dir)
         self.runs_dir = Path(runs_dir)
         
+        # Most recent upload saved by this process; avoids rescanning uploads_dir
+        self._latest_upload_id: Optional[str] = None
+        # Upload id -> (directory mtime_ns, tree JSON); only touched on the event loop
+        self._tree_cache: Dict[str, Tuple[int, bytes]] = {}
+        
+        # Shared HTTP session so URL uploads reuse pooled keep-alive connections
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20)
+        self.http.mount('http://', adapter)
+        self.http.mount('https://', adapter)
+        
         # Create directories if they don't exist
         self.uploads_dir.mkdir(exist_ok=True)
         self.runs_dir.mkdir(exist_ok=True)
+        
+        # Resolved once for the path security checks of every file read
+        self._uploads_resolved = self.uploads_dir.resolve()
     
     async def upload_zip_file(self, file_content: bytes, filename: str) -> UploadedSource:
         """
@@ -36,36 +147,11 @@ class StorageManager:
         Returns:
             UploadedSource with upload ID and file tree
         """
-        upload_id = generate_upload_id()
-        upload_path = self.uploads_dir / upload_id
-        upload_path.mkdir(exist_ok=True)
+        # Extract straight from memory through save_zip; no copy of the archive is
+        # written and read back
+        upload_id, root_node = await self.save_zip(file_content, filename)
         
-        # Save the ZIP file temporarily
-        zip_path = upload_path / filename
-        async with aiofiles.open(zip_path, 'wb') as f:
-            await f.write(file_content)
-        
-        try:
-            # Extract the ZIP file
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(upload_path)
-            
-            # Remove the ZIP file after extraction
-            zip_path.unlink()
-            
-            # Build the file tree
-            root_node = self.build_tree(upload_path, upload_id)
-            
-            return UploadedSource(uploadId=upload_id, root=root_node)
-            
-        except zipfile.BadZipFile:
-            # Clean up on error
-            shutil.rmtree(upload_path, ignore_errors=True)
-            raise ValueError("Invalid ZIP file")
-        except Exception as e:
-            # Clean up on error
-            shutil.rmtree(upload_path, ignore_errors=True)
-            raise Exception(f"Failed to extract ZIP file: {str(e)}")
+        return UploadedSource(uploadId=upload_id, root=root_node)
     
     async def upload_from_url(self, url: str) -> UploadedSource:
         """
@@ -77,51 +163,79 @@ class StorageManager:
         Returns:
             UploadedSource with upload ID and file tree
         """
-        upload_id = generate_upload_id()
-        upload_path = self.uploads_dir / upload_id
-        upload_path.mkdir(exist_ok=True)
+        # Download, extract and walk the tree off the event loop through save_url
+        upload_id, root_node = await self.save_url(url)
         
-        try:
-            # Download the file
-            response = requests.get(url, stream=True, timeout=30)
-            response.raise_for_status()
-            
-            # Determine filename from URL or Content-Disposition header
-            filename = self._get_filename_from_response(response, url)
-            
-            # Save the downloaded file
-            file_path = upload_path / filename
-            with open(file_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
-            # If it's a ZIP file, extract it
-            if filename.lower().endswith('.zip'):
-                with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                    zip_ref.extractall(upload_path)
-                # Remove the ZIP file after extraction
-                file_path.unlink()
-            
-            # Build the file tree
-            root_node = self.build_tree(upload_path, upload_id)
-            
-            return UploadedSource(uploadId=upload_id, root=root_node)
-            
-        except requests.RequestException as e:
-            # Clean up on error
-            shutil.rmtree(upload_path, ignore_errors=True)
-            raise Exception(f"Failed to download from URL: {str(e)}")
-        except Exception as e:
-            # Clean up on error
-            shutil.rmtree(upload_path, ignore_errors=True)
-            raise Exception(f"Failed to process downloaded file: {str(e)}")
+        return UploadedSource(uploadId=upload_id, root=root_node)
+    
+    def _extract_zip(self, zip_ref: zipfile.ZipFile, dest: Path):
+        """
+        Extract every member of an open archive into dest.
+        
+        Each member is streamed from the archive into its file in 1 MiB blocks.
+        Large archives are decompressed on a thread pool (zlib releases the GIL);
+        ZipFile serializes the reads of its underlying file, so the workers share it.
+        """
+        members = zip_ref.infolist()
+        if len(members) > MAX_ZIP_MEMBERS:
+            raise ValueError(f"ZIP file has too many entries ({len(members)} > {MAX_ZIP_MEMBERS})")
+        # Reads stop at each member's declared file_size, so the sum bounds what lands on disk
+        total_size = sum(member.file_size for member in members)
+        if total_size > MAX_ZIP_UNCOMPRESSED_BYTES:
+            raise ValueError(
+                f"ZIP file expands to {total_size} bytes (limit {MAX_ZIP_UNCOMPRESSED_BYTES})"
+            )
+        
+        # Plain strings from here on: dest is freshly created and extraction writes
+        # no symlinks, so normalizing the joined names is enough to contain them
+        dest_root = os.path.realpath(dest)
+        dest_prefix = os.path.join(dest_root, '')
+        targets = []
+        for member in members:
+            # Refuse archives with members that would land outside dest (zip-slip)
+            target = os.path.normpath(os.path.join(dest_root, member.filename))
+            if target != dest_root and not target.startswith(dest_prefix):
+                raise ValueError(f"Unsafe path in ZIP file: {member.filename}")
+            targets.append((member, target))
+        
+        # Every directory once, up front, so the members below only write files
+        dirs = {target if member.is_dir() else os.path.dirname(target) for member, target in targets}
+        for directory in sorted(dirs):
+            os.makedirs(directory, exist_ok=True)
+        targets = [(member, target) for member, target in targets if not member.is_dir()]
+        
+        def extract_member(item):
+            member, target = item
+            with zip_ref.open(member) as src, open(target, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+        
+        if EXTRACT_WORKERS == 1 or len(targets) < PARALLEL_EXTRACT_MIN_MEMBERS:
+            for item in targets:
+                extract_member(item)
+            return
+        
+        with ThreadPoolExecutor(max_workers=EXTRACT_WORKERS, thread_name_prefix="unzip") as executor:
+            # list() re-raises the first member that failed
+            list(executor.map(extract_member, targets))
     
     def _get_filename_from_response(self, response: requests.Response, url: str) -> str:
         """Extract filename from response headers or URL."""
         # Try to get filename from Content-Disposition header
-        content_disposition = response.headers.get('Content-Disposition', '')
-        if 'filename=' in content_disposition:
-            filename = content_disposition.split('filename=')[1].strip('"\'')
+        filename = None
+        for match in _CD_FILENAME_RE.finditer(response.headers.get('Content-Disposition', '')):
+            value = match.group('quoted') if match.group('quoted') is not None else match.group('token')
+            if match.group('ext'):
+                # filename* wins over a plain filename
+                try:
+                    filename = unquote(value, encoding=match.group('charset') or 'utf-8', errors='replace')
+                except LookupError:
+                    filename = unquote(value, errors='replace')
+                break
+            if filename is None:
+                filename = value
+        # The name is only used inside the upload directory
+        filename = os.path.basename(filename.replace('\\', '/')) if filename else ''
+        if filename not in ('', '.', '..'):
             return filename
         
         # Fallback to URL path
@@ -149,6 +263,11 @@ class StorageManager:
         Returns:
             File content as string
         """
+        # Path checks and the read are all blocking syscalls; do them in one worker thread
+        return await asyncio.to_thread(self._get_file_content_sync, file_path)
+    
+    def _get_file_content_sync(self, file_path: str) -> str:
+        """Blocking implementation of get_file_content."""
         # Validate and construct the full path
         if '/' not in file_path:
             raise ValueError("Invalid file path format")
@@ -157,24 +276,39 @@ class StorageManager:
         
         # Security check: ensure path is within uploads directory
         try:
-            full_path.resolve().relative_to(self.uploads_dir.resolve())
+            full_path.resolve().relative_to(self._uploads_resolved)
         except ValueError:
             raise ValueError("Invalid file path - outside uploads directory")
         
-        if not full_path.exists():
-            raise FileNotFoundError(f"File not found: {file_path}")
+        self._stat_regular_file(full_path, file_path)
+        return self._read_text(full_path)
+    
+    def close(self):
+        """Close pooled HTTP connections."""
+        self.http.close()
+    
+    def get_latest_upload(self) -> Optional[Path]:
+        """
+        Get the directory of the latest upload.
         
-        if not full_path.is_file():
-            raise ValueError(f"Path is not a file: {file_path}")
+        Returns:
+            Path to the latest upload directory, or None if there are no uploads
+        """
+        if self._latest_upload_id:
+            latest_upload = self.uploads_dir / self._latest_upload_id
+            if latest_upload.is_dir():
+                return latest_upload
         
-        try:
-            async with aiofiles.open(full_path, 'r', encoding='utf-8') as f:
-                return await f.read()
-        except UnicodeDecodeError:
-            # Try with different encoding for binary files
-            async with aiofiles.open(full_path, 'r', encoding='latin-1') as f:
-                content = await f.read()
-                return content[:1000] + "...\n[Binary file truncated]" if len(content) > 1000 else content
+        if not self.uploads_dir.exists():
+            return None
+        
+        # Fall back to a single pass over the upload directories (names end with a timestamp)
+        latest_upload = max(
+            (d for d in self.uploads_dir.iterdir() if d.is_dir()), key=lambda d: id_timestamp(d.name), default=None
+        )
+        if latest_upload is not None:
+            self._latest_upload_id = latest_upload.name
+        return latest_upload
     
     def get_upload_path(self, upload_id: str) -> Path:
         """Get the path to an upload directory."""
@@ -190,7 +324,7 @@ class StorageManager:
         run_path.mkdir(exist_ok=True)
         return run_path
     
-    def cleanup_upload(self, upload_id: str) -> bool:
+    async def cleanup_upload(self, upload_id: str) -> bool:
         """
         Clean up an upload directory.
         
@@ -200,16 +334,11 @@ class StorageManager:
         Returns:
             True if cleanup was successful
         """
-        upload_path = self.uploads_dir / upload_id
-        if upload_path.exists():
-            try:
-                shutil.rmtree(upload_path)
-                return True
-            except Exception:
-                return False
-        return True
+        self._tree_cache.pop(upload_id, None)
+        # Removing a large tree blocks for a while; keep it off the event loop
+        return await asyncio.to_thread(self._remove_tree, self.uploads_dir / upload_id)
     
-    def cleanup_run(self, run_id: str) -> bool:
+    async def cleanup_run(self, run_id: str) -> bool:
         """
         Clean up a run directory.
         
@@ -219,10 +348,13 @@ class StorageManager:
         Returns:
             True if cleanup was successful
         """
-        run_path = self.runs_dir / run_id
-        if run_path.exists():
+        return await asyncio.to_thread(self._remove_tree, self.runs_dir / run_id)
+    
+    def _remove_tree(self, path: Path) -> bool:
+        """Blocking implementation of cleanup_upload and cleanup_run."""
+        if path.exists():
             try:
-                shutil.rmtree(run_path)
+                shutil.rmtree(path)
                 return True
             except Exception:
                 return False
@@ -230,36 +362,40 @@ class StorageManager:
 
     # New API functions with exact signatures requested
     
-    async def save_zip(self, file_content: bytes, filename: str = "upload.zip") -> tuple[str, FileNode]:
+    async def save_zip(self, file_content: Union[bytes, BinaryIO], filename: str = "upload.zip") -> tuple[str, FileNode]:
         """
         Save ZIP file and return uploadId + FileNode.
         
         Args:
-            file_content: ZIP file content as bytes
+            file_content: ZIP file content as bytes, or a seekable binary file
+                (e.g. an UploadFile's spooled file) that is extracted in place
             filename: Optional filename (defaults to upload.zip)
             
         Returns:
             Tuple of (uploadId, FileNode)
         """
+        # Extraction writes every archive member and then walks the tree;
+        # run it off the event loop like save_url
+        return await asyncio.to_thread(self._save_zip_sync, file_content)
+    
+    def _save_zip_sync(self, file_content: Union[bytes, BinaryIO]) -> tuple[str, FileNode]:
+        """Blocking implementation of save_zip."""
         upload_id = generate_upload_id()
         upload_path = self.uploads_dir / upload_id
         upload_path.mkdir(exist_ok=True)
         
-        # Save the ZIP file temporarily
-        zip_path = upload_path / filename
-        async with aiofiles.open(zip_path, 'wb') as f:
-            await f.write(file_content)
+        if isinstance(file_content, bytes):
+            file_content = io.BytesIO(file_content)
         
         try:
-            # Extract the ZIP file
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(upload_path)
-            
-            # Remove the ZIP file after extraction
-            zip_path.unlink()
+            # Extract straight from the file object; no copy of the archive is written
+            file_content.seek(0)
+            with zipfile.ZipFile(file_content, 'r') as zip_ref:
+                self._extract_zip(zip_ref, upload_path)
             
             # Build the file tree
             root_node = self.build_tree(upload_path, upload_id)
+            self._latest_upload_id = upload_id
             
             return upload_id, root_node
             
@@ -267,6 +403,10 @@ class StorageManager:
             # Clean up on error
             shutil.rmtree(upload_path, ignore_errors=True)
             raise ValueError("Invalid ZIP file")
+        except ValueError:
+            # Refused archive (unsafe paths, too large); reported as a bad upload
+            shutil.rmtree(upload_path, ignore_errors=True)
+            raise
         except Exception as e:
             # Clean up on error
             shutil.rmtree(upload_path, ignore_errors=True)
@@ -282,33 +422,43 @@ class StorageManager:
         Returns:
             Tuple of (uploadId, FileNode)
         """
+        # The download, extraction and tree walk all block; run them off the event loop
+        return await asyncio.to_thread(self._save_url_sync, url)
+    
+    def _save_url_sync(self, url: str) -> tuple[str, FileNode]:
+        """Blocking implementation of save_url."""
         upload_id = generate_upload_id()
         upload_path = self.uploads_dir / upload_id
         upload_path.mkdir(exist_ok=True)
         
         try:
-            # Download the file
-            response = requests.get(url, stream=True, timeout=30)
-            response.raise_for_status()
-            
-            # Determine filename from URL or Content-Disposition header
-            filename = self._get_filename_from_response(response, url)
-            
-            # Save the downloaded file
-            file_path = upload_path / filename
-            with open(file_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
-            # If it's a ZIP file, extract it
-            if filename.lower().endswith('.zip'):
-                with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                    zip_ref.extractall(upload_path)
-                # Remove the ZIP file after extraction
-                file_path.unlink()
+            # Download the file over the shared session; closing the response
+            # returns its connection to the pool
+            with self.http.get(url, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                
+                # Determine filename from URL or Content-Disposition header
+                filename = self._get_filename_from_response(response, url)
+                
+                is_zip = filename.lower().endswith('.zip')
+                # ZIP files are spooled and extracted from there, so the archive is never
+                # written into the upload and read back; other files are saved as they are
+                target = (tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_BYTES) if is_zip
+                          else open(upload_path / filename, 'wb'))
+                with target:
+                    # Copy straight from the raw stream; decode_content keeps
+                    # gzip/deflate transfer encodings handled as iter_content did
+                    response.raw.decode_content = True
+                    shutil.copyfileobj(response.raw, target, DOWNLOAD_CHUNK_SIZE)
+                    
+                    if is_zip:
+                        target.seek(0)
+                        with zipfile.ZipFile(target, 'r') as zip_ref:
+                            self._extract_zip(zip_ref, upload_path)
             
             # Build the file tree
             root_node = self.build_tree(upload_path, upload_id)
+            self._latest_upload_id = upload_id
             
             return upload_id, root_node
             
@@ -316,11 +466,46 @@ class StorageManager:
             # Clean up on error
             shutil.rmtree(upload_path, ignore_errors=True)
             raise Exception(f"Failed to download from URL: {str(e)}")
+        except zipfile.BadZipFile:
+            # Clean up on error
+            shutil.rmtree(upload_path, ignore_errors=True)
+            raise ValueError("Invalid ZIP file")
+        except ValueError:
+            # Refused archive (unsafe paths, too large); reported as a bad upload
+            shutil.rmtree(upload_path, ignore_errors=True)
+            raise
         except Exception as e:
             # Clean up on error
             shutil.rmtree(upload_path, ignore_errors=True)
             raise Exception(f"Failed to process downloaded file: {str(e)}")
     
+    async def tree_json(self, upload_path: Path, upload_id: str, mtime_ns: int) -> bytes:
+        """
+        FileNode JSON of an upload's tree, rebuilt only when its directory changes.
+        
+        Args:
+            upload_path: Path to the upload directory
+            upload_id: The upload ID, used as path prefix and cache key
+            mtime_ns: Current st_mtime_ns of upload_path
+            
+        Returns:
+            The serialized tree
+        """
+        cached = self._tree_cache.get(upload_id)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        
+        # The directory walk runs in a worker thread
+        tree = await asyncio.to_thread(self.build_flat_tree, upload_path, upload_id)
+        data = tree.to_json_bytes()
+        
+        self._tree_cache.pop(upload_id, None)
+        self._tree_cache[upload_id] = (mtime_ns, data)
+        if len(self._tree_cache) > TREE_CACHE_SIZE:
+            # Dicts keep insertion order; the first key is the least recently built
+            del self._tree_cache[next(iter(self._tree_cache))]
+        return data
+    
     def build_tree(self, base_path: Path, upload_id: str = None) -> FileNode:
         """
         Build FileNode tree from a directory path.
@@ -332,42 +517,21 @@ class StorageManager:
         Returns:
             FileNode representing the directory tree
         """
-        def build_node(path: Path, relative_to: Path) -> FileNode:
-            relative_path = str(path.relative_to(relative_to))
-            
-            # Set the path prefix based on upload_id
-            if upload_id:
-                full_path = f"{upload_id}/{relative_path}"
-            else:
-                full_path = relative_path
+        return FileNode.model_validate(self.build_flat_tree(base_path, upload_id).to_dict())
+    
+    def build_flat_tree(self, base_path: Path, upload_id: str = None) -> FlatTree:
+        """
+        Build a FlatTree from a directory path with an iterative walk.
+        
+        Args:
+            base_path: Path to the directory to build tree from
+            upload_id: Optional upload ID for path prefixes (if None, uses relative paths)
             
-            if path.is_file():
-                return FileNode(
-                    name=path.name,
-                    path=full_path,
-                    isDir=False
-                )
-            else:
-                children = []
-                try:
-                    for child_path in sorted(path.iterdir()):
-                        # Skip hidden files and common non-source directories
-                        if child_path.name.startswith('.'):
-                            continue
-                        if child_path.name in ['node_modules', '__pycache__', '.git', 'dist', 'build']:
-                            continue
-                        
-                        children.append(build_node(child_path, relative_to))
-                except PermissionError:
-                    # Skip directories we can't read
-                    pass
-                
-                return FileNode(
-                    name=path.name,
-                    path=full_path,
-                    isDir=True,
-                    children=children if children else None
-                )
+        Returns:
+            FlatTree with the same nodes and order as build_tree
+        """
+        tree = FlatTree()
+        prefix = f"{upload_id}/" if upload_id else ""
         
         # Handle the case where base_path is the actual directory to scan
         if not base_path.exists():
@@ -375,27 +539,48 @@ class StorageManager:
         
         if base_path.is_file():
             # If it's a single file, create a simple node
-            return FileNode(
-                name=base_path.name,
-                path=upload_id or base_path.name,
-                isDir=False
-            )
+            tree.add(base_path.name, upload_id or base_path.name, -1, False)
+            return tree
+        
+        # Stack of (filesystem path, name, relative path, parent index, is file),
+        # pushed in reverse so nodes pop in listing order
+        stack = []
         
         # Find the actual root (handle single directory extraction)
-        root_items = list(base_path.iterdir())
-        if len(root_items) == 1 and root_items[0].is_dir():
+        with os.scandir(base_path) as entries:
+            root_items = sorted(entries, key=_entry_name)
+        if len(root_items) == 1 and root_items[0].is_dir() and not _is_skipped(root_items[0].name):
             # If there's only one directory, use it as root
             actual_root = root_items[0]
-            return build_node(actual_root, base_path)
+            stack.append((actual_root.path, actual_root.name, actual_root.name, -1, False))
         else:
             # Multiple items at root level or use the base directory itself
-            return FileNode(
-                name=upload_id or base_path.name,
-                path=upload_id or str(base_path),
-                isDir=True,
-                children=[build_node(item, base_path) for item in root_items 
-                         if not item.name.startswith('.')]
-            )
+            tree.add(upload_id or base_path.name, upload_id or str(base_path), -1, True)
+            tree.keep_empty_root = True
+            for entry in reversed(root_items):
+                if not _is_skipped(entry.name):
+                    stack.append((entry.path, entry.name, entry.name, 0, entry.is_file()))
+        
+        while stack:
+            path, name, relative_path, parent, is_file = stack.pop()
+            index = tree.add(name, prefix + relative_path, parent, not is_file)
+            if is_file:
+                continue
+            
+            try:
+                with os.scandir(path) as entries:
+                    children = sorted(entries, key=_entry_name)
+            except PermissionError:
+                # Skip directories we can't read
+                continue
+            
+            for entry in reversed(children):
+                # Skip hidden files and common non-source directories
+                if _is_skipped(entry.name):
+                    continue
+                stack.append((entry.path, entry.name, os.path.join(relative_path, entry.name), index, entry.is_file()))
+        
+        return tree
     
     async def read_file(self, file_path: str) -> str:
         """
@@ -407,6 +592,41 @@ class StorageManager:
         Returns:
             File content as string
         """
+        # Path checks and the read are all blocking syscalls; do them in one worker thread
+        return await asyncio.to_thread(self._read_file_sync, file_path)
+    
+    async def read_files(self, file_paths: List[str]) -> List[str]:
+        """
+        Read several files from uploads directory concurrently.
+        
+        Args:
+            file_paths: Paths to the files, in the same formats as read_file
+            
+        Returns:
+            File contents in the order of file_paths; the first failing path raises
+        """
+        return list(await asyncio.gather(
+            *(asyncio.to_thread(self._read_file_sync, file_path) for file_path in file_paths)
+        ))
+    
+    async def stat_file(self, file_path: str) -> os.stat_result:
+        """
+        Stat a file from uploads directory, with the same path checks as read_file.
+        
+        Args:
+            file_path: Path to the file (format: upload_id/relative/path or absolute path)
+            
+        Returns:
+            The file's stat result
+        """
+        return await asyncio.to_thread(lambda: self._resolve_file_stat(file_path)[1])
+    
+    def _resolve_file(self, file_path: str) -> Path:
+        """Validate a read_file path and return the file it points to."""
+        return self._resolve_file_stat(file_path)[0]
+    
+    def _resolve_file_stat(self, file_path: str) -> Tuple[Path, os.stat_result]:
+        """Validate a read_file path and return the file it points to with its stat result."""
         # Handle both absolute paths and upload_id/relative paths
         if file_path.startswith('/'):
             # Absolute path
@@ -418,28 +638,64 @@ class StorageManager:
         # Security check: if it's under uploads dir, ensure path is within uploads directory
         if str(full_path).startswith(str(self.uploads_dir)):
             try:
-                full_path.resolve().relative_to(self.uploads_dir.resolve())
+                full_path.resolve().relative_to(self._uploads_resolved)
             except ValueError:
                 raise ValueError("Invalid file path - outside uploads directory")
         
-        if not full_path.exists():
+        return full_path, self._stat_regular_file(full_path, file_path)
+    
+    def _stat_regular_file(self, full_path: Path, file_path: str) -> os.stat_result:
+        """Stat a path once, raising unless it is an existing regular file."""
+        try:
+            file_stat = full_path.stat()
+        except (FileNotFoundError, NotADirectoryError):
             raise FileNotFoundError(f"File not found: {file_path}")
         
-        if not full_path.is_file():
+        if not stat.S_ISREG(file_stat.st_mode):
             raise ValueError(f"Path is not a file: {file_path}")
         
+        return file_stat
+    
+    def _read_file_sync(self, file_path: str) -> str:
+        """Blocking implementation of read_file."""
+        return self._read_text(self._resolve_file(file_path))
+    
+    def _read_text(self, full_path: Path) -> str:
+        """
+        Read a file as UTF-8 text, or the start of it as latin-1 if it is binary.
+        
+        The first BINARY_SNIFF_BYTES are checked first, so binary files are never read in full.
+        """
+        with open(full_path, 'rb') as f:
+            head = f.read(BINARY_SNIFF_BYTES)
+            if b'\0' not in head and self._is_utf8_prefix(head):
+                try:
+                    return _universal_newlines((head + f.read()).decode('utf-8'))
+                except UnicodeDecodeError:
+                    pass
+        
+        # Try with different encoding for binary files
+        content = _universal_newlines(head.decode('latin-1'))[:1001]
+        return content[:1000] + "...\n[Binary file truncated]" if len(content) > 1000 else content
+    
+    def _is_utf8_prefix(self, data: bytes) -> bool:
+        """Whether data is valid UTF-8, allowing a character cut off at the end."""
         try:
-            async with aiofiles.open(full_path, 'r', encoding='utf-8') as f:
-                return await f.read()
+            codecs.getincrementaldecoder('utf-8')().decode(data)
+            return True
         except UnicodeDecodeError:
-            # Try with different encoding for binary files
-            try:
-                async with aiofiles.open(full_path, 'r', encoding='latin-1') as f:
-                    content = await f.read()
-                    return content[:1000] + "...\n[Binary file truncated]" if len(content) > 1000 else content
-            except Exception:
-                return "[Binary file - cannot display content]"
+            return False
+
+
+def _universal_newlines(text: str) -> str:
+    """Translate \r\n and \r to \n, as reading in text mode does."""
+    return text.replace('\r\n', '\n').replace('\r', '\n')
 
 
 # Global storage manager instance
 storage_manager = StorageManager()
+
+
+async def get_storage() -> StorageManager:
+    """FastAPI dependency providing the shared storage manager."""
+    return storage_manager
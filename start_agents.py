@@ -10,6 +10,7 @@ import os
 import time
 import signal
 import threading
+from importlib.metadata import distribution, PackageNotFoundError
 from pathlib import Path
 
 def print_banner():
@@ -22,6 +23,14 @@ def print_banner():
     print("🎯 Frontend integration ready")
     print("=" * 80)
 
+def _is_missing(package):
+    """Check installed package metadata without importing the package"""
+    try:
+        distribution(package)
+    except PackageNotFoundError:
+        return True
+    return False
+
 def check_dependencies():
     """Check if required dependencies are available"""
     print("📋 Checking dependencies...")
@@ -32,12 +41,7 @@ def check_dependencies():
         'langchain-groq', 'langgraph', 'matplotlib', 'seaborn'
     ]
     
-    missing_packages = []
-    for package in required_packages:
-        try:
-            __import__(package.replace('-', '_'))
-        except ImportError:
-            missing_packages.append(package)
+    missing_packages = [package for package in required_packages if _is_missing(package)]
     
     if missing_packages:
         print(f"⚠️  Missing Python packages: {', '.join(missing_packages)}")